@@ -2,5 +2,7 @@ from .symptom_agent  import SymptomAgent
 from .dosha_agent    import DoshaAgent
 from .guidance_agent import GuidanceAgent
 from .safety_agent   import SafetyAgent
+from .vision_agent   import VisionAgent
 
-__all__ = ["SymptomAgent", "DoshaAgent", "GuidanceAgent", "SafetyAgent"]
+__all__ = ["SymptomAgent", "DoshaAgent", "GuidanceAgent", "SafetyAgent",
+           "VisionAgent"]
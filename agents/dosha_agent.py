@@ -25,12 +25,17 @@ class DoshaAgent:
         },
     }
 
-    def run(self, state: dict) -> dict:
+    def updates(self, state) -> dict:
         primary = state.get("primary_dosha", "Vata")
         treatment = self.DOSHA_TREATMENTS.get(primary,
                     self.DOSHA_TREATMENTS["Vata"])
         return {
-            **state,
             "dosha_treatment": treatment,
             "constitution":    f"{primary}-dominant",
         }
+
+    def run(self, state: dict) -> dict:
+        return {**state, **self.updates(state)}
+
+    def updates_batch(self, states: list) -> list:
+        return [self.updates(state) for state in states]
@@ -1,36 +1,111 @@
+import os
+import threading
+import time
+from contextlib import ExitStack
+from itertools import groupby
 import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM
-from peft import PeftModel
+from transformers import StoppingCriteria, StoppingCriteriaList
+from serving import metrics, tracing
+from serving.batching import MicroBatcher
+from serving.continuous import ContinuousBatchingEngine, eos_token_ids
+from serving.models import get_registry
+from serving.prefix_cache import PrefixKVCache, concat_caches
+from serving.stopping import (FirstTokenTimer, CancellationCriteria,
+                              StructureStoppingCriteria)
+from serving.cancellation import GenerationCancelled
+from serving.executor import get_executor, QueueFullError
+from serving.deadline import DeadlineExceeded, remaining
 
-BASE_MODEL = "google/medgemma-4b-it"
-LORA_PATH  = "models/medgemma-ayurveda-lora/final"
+MAX_NEW_TOKENS = 512
+PROMPT_VERSION = 1   # bump whenever build_prompt's wording changes
 
-_model     = None
-_tokenizer = None
+# Static opening shared by every prompt; its KV cache is computed once
+PROMPT_PREFIX = ("<start_of_turn>user\n"
+                 "You are an Ayurvedic clinical assistant. "
+                 "A patient presents with the following:")
+PREFIX_CACHE_ENABLED = os.environ.get("AYURVEDA_PREFIX_CACHE", "1") == "1"
+
+# Fine-tune answers end with this section; SafetyAgent adds its own disclaimer,
+# so generation stops once the section is done or the model starts one
+FINAL_SECTION      = "PATIENT RECOMMENDATIONS:"
+STOP_MARKERS       = ("DISCLAIMER",)
+EARLY_STOP_ENABLED = os.environ.get("AYURVEDA_EARLY_STOP", "1") == "1"
+
+# static: MicroBatcher + batched generate; continuous: iteration-level engine
+BATCHING             = os.environ.get("AYURVEDA_BATCHING", "static")
+CONTINUOUS_MAX_BATCH = int(os.environ.get("AYURVEDA_CONTINUOUS_MAX_BATCH", "8"))
+
+# Greedy-equivalent speculative decoding: off | draft | prompt_lookup
+SPECULATIVE_MODES    = ("off", "draft", "prompt_lookup")
+SPECULATIVE          = os.environ.get("AYURVEDA_SPECULATIVE", "off")
+PROMPT_LOOKUP_TOKENS = int(os.environ.get("AYURVEDA_PROMPT_LOOKUP_TOKENS", "10"))
+
+# Rows per generate call in offline batch runs (run_ayurveda_pipeline_batch)
+PIPELINE_BATCH_SIZE = int(os.environ.get("AYURVEDA_PIPELINE_BATCH_SIZE", "8"))
+
+_batcher      = None
+_engine       = None
+_engine_lock  = threading.Lock()
+_prefix_caches = {}   # PEFT adapter name → PrefixKVCache
+_prefix_lock    = threading.Lock()
+_prefix_ids     = None   # PROMPT_PREFIX token ids, (1, n)
 
 def _load_model():
-    global _model, _tokenizer
-    if _model is None:
-        print("[GuidanceAgent] Loading fine-tuned MedGemma...")
-        _tokenizer = AutoTokenizer.from_pretrained(BASE_MODEL, token=True)
-        _tokenizer.pad_token = _tokenizer.eos_token
-        base = AutoModelForCausalLM.from_pretrained(
-            BASE_MODEL, token=True, dtype=torch.float16, device_map="auto"
-        )
-        _model = PeftModel.from_pretrained(base, LORA_PATH)
-        _model.eval()
-        print("[GuidanceAgent] Model ready!")
-    return _model, _tokenizer
+    # Shared with VisionAgent — the registry loads MedGemma once per process
+    return get_registry().text_model()
 
 
-class GuidanceAgent:
-    """Calls the fine-tuned MedGemma model to generate clinical guidance."""
+def _default_adapter() -> str:
+    return get_registry().get_adapter().peft_name
 
-    def run(self, state: dict) -> dict:
-        model, tokenizer = _load_model()
-        treatment = state.get("dosha_treatment", {})
 
-        instruction = f"""You are an Ayurvedic clinical assistant. A patient presents with the following:
+def _get_prefix_cache(adapter: str = None) -> PrefixKVCache:
+    """Prefix KV cache as computed through `adapter` (LoRA changes k/v)."""
+    registry = get_registry()
+    adapter  = adapter or _default_adapter()
+    with _prefix_lock:
+        if adapter not in _prefix_caches:
+            model, tokenizer = _load_model()
+            # Drop caches of adapters that have since been unloaded
+            live = {a["peft_name"] for a in registry.adapters().values()}
+            for stale in set(_prefix_caches) - live:
+                del _prefix_caches[stale]
+            with registry.generating([adapter]) as adapter_kwargs:
+                cache = PrefixKVCache(model, tokenizer, PROMPT_PREFIX, **adapter_kwargs)
+            _prefix_caches[adapter] = cache
+            print(f"[GuidanceAgent] Prefix cache ready for {adapter}: {cache.num_tokens} "
+                  f"tokens, {cache.prefill_seconds * 1000:.1f} ms prefill")
+    return _prefix_caches[adapter]
+
+
+def _prompt_prefix_ids(tokenizer) -> torch.Tensor:
+    """PROMPT_PREFIX tokenized as PrefixKVCache does, without building a cache."""
+    global _prefix_ids
+    if _prefix_ids is None:
+        _prefix_ids = tokenizer(PROMPT_PREFIX, return_tensors="pt",
+                                return_token_type_ids=False)["input_ids"]
+    return _prefix_ids
+
+
+def generation_config(adapter: str = None) -> dict:
+    """Everything besides the patient fields that determines the output."""
+    registry = get_registry()
+    return {
+        "base_model":     registry.base_model,
+        "adapter_hash":   registry.get_adapter(adapter).hash,
+        "serving_mode":   registry.mode,   # merged weights round differently
+        **registry.backend(),
+        "prompt_version": PROMPT_VERSION,
+        "max_new_tokens": MAX_NEW_TOKENS,
+        "early_stop":     EARLY_STOP_ENABLED,
+        "do_sample":      False,
+    }
+
+
+def build_prompt(state: dict) -> str:
+    treatment = state.get("dosha_treatment", {})
+
+    details = f"""
 
 Disease: {state.get("disease", "Unknown")}
 Symptoms: {state.get("symptoms", "Not specified")}
@@ -45,21 +120,526 @@ Treatment Principle: {treatment.get("principle", "")}
 
 Provide a structured Ayurvedic assessment and treatment plan."""
 
-        prompt = (f"<start_of_turn>user\n{instruction}<end_of_turn>\n"
-                  f"<start_of_turn>model\n")
+    return (f"{PROMPT_PREFIX}{details}<end_of_turn>\n"
+            f"<start_of_turn>model\n")
+
+
+# Served instead of model output when GuidanceAgent misses the request deadline
+DEGRADED_TEMPLATE = """**Dosha Analysis:** {analysis}; secondary: {secondary}. Constitution: {constitution}.
+
+**Treatment Principle:** {principle}
+
+**Recommended Herbs:** {herbs}
+
+**Diet and Lifestyle:** {recommend}. Avoid: {avoid}.
+
+**Yoga:** {yoga}
+
+Note: the assessment model was busy, so this is the rule-based dosha analysis only and is not tailored to {disease}. Request again later for a full assessment."""
+
+
+def build_degraded_output(state) -> str:
+    """Templated assessment from SymptomAgent and DoshaAgent results alone."""
+    treatment = state.get("dosha_treatment", {})
+    return DEGRADED_TEMPLATE.format(
+        analysis=state.get("symptom_analysis", "Not available"),
+        secondary=state.get("secondary_dosha", "None"),
+        constitution=state.get("constitution", "Not available"),
+        principle=treatment.get("principle", "Not available"),
+        herbs=treatment.get("herbs", "Not available"),
+        recommend=treatment.get("recommend", "Not available"),
+        avoid=treatment.get("avoid", "Not available"),
+        yoga=treatment.get("yoga", "Not available"),
+        disease=state.get("disease", "your condition"),
+    )
+
+
+def _encode(prompts: list, tokenizer, device, adapters: list) -> dict:
+    """
+    Tokenize as [prefix | left padding | patient details] so every row shares
+    the cached prefix positions; padding is masked out, and generate derives
+    position ids from the mask, so rows decode exactly as if unpadded.
+    """
+    batch_size = len(prompts)
+    suffixes = []
+    for p in prompts:
+        assert p.startswith(PROMPT_PREFIX), "prompt must come from build_prompt"
+        suffixes.append(p[len(PROMPT_PREFIX):])
+
+    enc = tokenizer(suffixes, return_tensors="pt", padding=True,
+                    add_special_tokens=False,
+                    return_token_type_ids=False).to(device)
+    prefix_ids = _prompt_prefix_ids(tokenizer).to(device).expand(batch_size, -1)
+
+    inputs = {
+        "input_ids": torch.cat([prefix_ids, enc["input_ids"]], dim=1),
+        "attention_mask": torch.cat(
+            [torch.ones_like(prefix_ids), enc["attention_mask"]], dim=1),
+    }
+    if PREFIX_CACHE_ENABLED:
+        # One clone per run of rows sharing an adapter, stacked in row order
+        runs = []
+        for adapter in adapters:
+            if runs and runs[-1][0] == adapter:
+                runs[-1][1] += 1
+            else:
+                runs.append([adapter, 1])
+        inputs["past_key_values"] = concat_caches(
+            [_get_prefix_cache(adapter).clone(n) for adapter, n in runs])
+    return inputs
+
+
+def _stop_criteria(tokenizer, batch_size: int, prompt_length: int) -> list:
+    if not EARLY_STOP_ENABLED:
+        return []
+    return [StructureStoppingCriteria(tokenizer, batch_size, prompt_length,
+                                      FINAL_SECTION, STOP_MARKERS)]
+
+
+def _trim(text: str) -> str:
+    """Drop anything from the model's own disclaimer on."""
+    for marker in STOP_MARKERS:
+        if marker in text:
+            text = text[:text.index(marker)]
+    return text.rstrip()
+
+
+class _TextCallbacks(StoppingCriteria):
+    """
+    Never stops; after each step passes every row's newly decoded text to
+    that row's callback (None: not streamed). Text is held back after the
+    last whitespace and from a stop marker on, so the fragments always add up
+    to a prefix of the row's final text; `flush` sends the rest of it.
+    """
+
+    def __init__(self, tokenizer, prompt_length: int, callbacks: list):
+        self.tokenizer     = tokenizer
+        self.prompt_length = prompt_length
+        self.callbacks     = list(callbacks)
+        self.sent          = [0] * len(self.callbacks)
+
+    def __call__(self, input_ids, scores, **kwargs) -> torch.BoolTensor:
+        for i, on_text in enumerate(self.callbacks):
+            if on_text is not None:
+                text = self.tokenizer.decode(input_ids[i, self.prompt_length:],
+                                             skip_special_tokens=True)
+                text = _trim(text) if EARLY_STOP_ENABLED else text
+                self._send(i, text[:max(text.rfind(" "), text.rfind("\n")) + 1])
+        return torch.zeros(input_ids.shape[0], dtype=torch.bool, device=input_ids.device)
+
+    def flush(self, i: int, text: str):
+        """Send the rest of row i's final `text`."""
+        if self.callbacks[i] is not None:
+            self._send(i, text)
+
+    def _send(self, i: int, text: str):
+        if len(text) > self.sent[i]:
+            self.callbacks[i](text[self.sent[i]:])
+            self.sent[i] = len(text)
+
+
+def _timeline(start: float, timer: FirstTokenTimer, generated: float,
+              decoded: float) -> dict:
+    """perf_counter (start, end) of each generation phase, for tracing spans."""
+    first = timer.first_token_at or generated
+    return {"tokenize":   (start, timer.start),
+            "prefill":    (timer.start, first),
+            "decode":     (first, generated),
+            "detokenize": (generated, decoded)}
+
+
+def _result(text: str, prompt_tokens: int, generated_tokens: int,
+            timer: FirstTokenTimer, stop_reason: str = None,
+            max_new_tokens: int = MAX_NEW_TOKENS, timeline: dict = None,
+            cached_prefix_tokens: int = 0) -> dict:
+    """Result row; `cached_prefix_tokens` were taken from the prefix cache."""
+    return {
+        "text":                 _trim(text) if EARLY_STOP_ENABLED else text,
+        "prompt_tokens":        prompt_tokens,
+        "generated_tokens":     generated_tokens,
+        "stop_reason":          stop_reason,
+        "tokens_saved":         max_new_tokens - generated_tokens if stop_reason else 0,
+        "cached_prefix_tokens": cached_prefix_tokens,
+        **timer.timings(generated_tokens),
+        "timeline":             timeline,
+    }
 
-        inputs = tokenizer(prompt, return_tensors="pt",
-                           return_token_type_ids=False).to(model.device)
 
-        with torch.inference_mode():
-            outputs = model.generate(
-                **inputs, max_new_tokens=512,
-                do_sample=False, pad_token_id=tokenizer.eos_token_id
-            )
+def _record(stats: dict, adapter: str):
+    metrics.ADAPTER_REQUESTS.inc(adapter=adapter)
+    metrics.ADAPTER_GENERATED_TOKENS.inc(stats["generated_tokens"], adapter=adapter)
+    metrics.ADAPTER_DECODE_TPS.observe(stats["decode_tokens_per_second"], adapter=adapter)
+    metrics.PROMPT_TOKENS.inc(stats["prompt_tokens"], agent="guidance")
+    metrics.GENERATED_TOKENS.inc(stats["generated_tokens"], agent="guidance")
+    metrics.TIME_TO_FIRST_TOKEN.observe(stats["ttft_seconds"], agent="guidance")
+    metrics.TOKENS_PER_SECOND.observe(stats["decode_tokens_per_second"], agent="guidance")
+    metrics.PREFIX_TOKENS_REUSED.inc(stats["cached_prefix_tokens"])
+    if stats["stop_reason"]:
+        metrics.EARLY_STOPS.inc(agent="guidance", reason=stats["stop_reason"])
+        metrics.EARLY_STOP_TOKENS_SAVED.inc(stats["tokens_saved"], agent="guidance",
+                                            reason=stats["stop_reason"])
 
-        raw = tokenizer.decode(
-            outputs[0][inputs["input_ids"].shape[-1]:],
-            skip_special_tokens=True
+
+def speculative_kwargs(mode: str = None) -> dict:
+    """
+    generate() kwargs for assisted decoding. Candidates come from the small
+    draft model or from n-gram matches against the prompt and text so far.
+    The target model verifies every candidate, so the output is still greedy.
+    """
+    mode = SPECULATIVE if mode is None else mode
+    if mode not in SPECULATIVE_MODES:
+        raise ValueError(f"Unknown speculative mode {mode!r}; "
+                         f"expected one of {SPECULATIVE_MODES}")
+    if mode == "draft":
+        model, tokenizer = _load_model()
+        draft, draft_tokenizer = get_registry().draft_model()
+        kwargs = {"assistant_model": draft}
+        if (draft.config.get_text_config().vocab_size
+                != model.config.get_text_config().vocab_size):
+            # Padded vocabularies differ; let generate translate between them
+            kwargs.update(tokenizer=tokenizer, assistant_tokenizer=draft_tokenizer)
+        return kwargs
+    if mode == "prompt_lookup":
+        return {"prompt_lookup_num_tokens": PROMPT_LOOKUP_TOKENS}
+    return {}
+
+
+def _cancelled(token, stage: str) -> GenerationCancelled:
+    metrics.CANCELLED_GENERATIONS.inc(agent="guidance", stage=stage)
+    return GenerationCancelled(token.reason)
+
+
+def generate_batch(prompts: list, max_new_tokens: int = MAX_NEW_TOKENS,
+                   cancel_tokens: list = None, speculative: str = None,
+                   adapters: list = None, on_texts: list = None) -> list:
+    """
+    Greedy-decode several prompts in one batched `generate` call. A row whose
+    cancel token fires stops decoding at the next step and comes back as a
+    GenerationCancelled instance instead of a result. `adapters` gives each
+    row's PEFT adapter name (default adapter if omitted); rows may differ.
+    `on_texts[i]`, if set, is called with row i's text as it is decoded.
+    """
+    model, tokenizer = _load_model()
+    cancel_tokens = cancel_tokens or [None] * len(prompts)
+    adapters      = adapters or [_default_adapter()] * len(prompts)
+    on_texts      = on_texts or [None] * len(prompts)
+    spec_kwargs   = speculative_kwargs(speculative)
+    if spec_kwargs and len(prompts) > 1:
+        # Assisted generation only handles one sequence per call
+        return [result
+                for prompt, token, adapter, on_text
+                in zip(prompts, cancel_tokens, adapters, on_texts)
+                for result in generate_batch([prompt], max_new_tokens, [token],
+                                             speculative, [adapter], [on_text])]
+    start  = time.perf_counter()
+    inputs = _encode(prompts, tokenizer, model.device, adapters)
+    # Read before generate extends the cache
+    reused = (inputs["past_key_values"].get_seq_length()
+              if "past_key_values" in inputs else 0)
+    timer  = FirstTokenTimer()
+    prompt_length = inputs["input_ids"].shape[-1]
+    structure = _stop_criteria(tokenizer, len(prompts), prompt_length)
+    streams   = _TextCallbacks(tokenizer, prompt_length, on_texts)
+
+    with torch.inference_mode(), get_registry().generating(adapters) as adapter_kwargs:
+        outputs = model.generate(
+            **inputs, max_new_tokens=max_new_tokens,
+            stopping_criteria=StoppingCriteriaList(
+                [timer, CancellationCriteria(cancel_tokens), *structure,
+                 *([streams] if any(on_texts) else [])]),
+            do_sample=False, pad_token_id=tokenizer.eos_token_id, **spec_kwargs,
+            **adapter_kwargs
         )
+    generated_at = time.perf_counter()
+
+    # Padding sits before the details, so every row's generation starts here
+    generated = outputs[:, prompt_length:]
+    texts = tokenizer.batch_decode(generated, skip_special_tokens=True)
+    timeline = _timeline(start, timer, generated_at, time.perf_counter())
+    results = []
+    for i, (text, token) in enumerate(zip(texts, cancel_tokens)):
+        if token is not None and token.cancelled:
+            results.append(_cancelled(token, "decoding"))
+            continue
+        results.append(_result(text,
+                               int(inputs["attention_mask"][i].sum()),
+                               int((generated[i] != tokenizer.pad_token_id).sum()),
+                               timer,
+                               structure[0].reasons[i] if structure else None,
+                               max_new_tokens, timeline, reused))
+        streams.flush(i, results[-1]["text"])
+    return results
+
+
+class _Request:
+    """One MicroBatcher item: a prompt and how to generate it."""
+    __slots__ = ("prompt", "cancel_token", "adapter", "deadline", "max_new_tokens",
+                 "on_text")
+
+    def __init__(self, prompt, cancel_token=None, adapter=None, deadline=None,
+                 max_new_tokens=MAX_NEW_TOKENS, on_text=None):
+        self.prompt         = prompt
+        self.cancel_token   = cancel_token
+        self.adapter        = adapter
+        self.deadline       = deadline
+        self.max_new_tokens = max_new_tokens
+        self.on_text        = on_text
+
+
+def _generate_requests(requests: list) -> list:
+    """Batcher entry point: _Request items → results."""
+    results = [None] * len(requests)
+    live = []
+    for i, req in enumerate(requests):
+        if req.cancel_token is not None and req.cancel_token.cancelled:
+            results[i] = _cancelled(req.cancel_token, "queued")
+        elif remaining(req.deadline) <= 0:
+            results[i] = DeadlineExceeded()   # expired while the batch formed
+        else:
+            live.append(i)
+    # One generate call per token budget; rows sharing an adapter sit
+    # together, so their prefix caches clone once
+    live.sort(key=lambda i: (requests[i].max_new_tokens, str(requests[i].adapter)))
+    for max_new_tokens, rows in groupby(live, key=lambda i: requests[i].max_new_tokens):
+        rows = list(rows)
+        generated = generate_batch(
+            [requests[i].prompt for i in rows], max_new_tokens,
+            cancel_tokens=[requests[i].cancel_token for i in rows],
+            adapters=[requests[i].adapter or _default_adapter() for i in rows],
+            on_texts=[requests[i].on_text for i in rows])
+        for i, result in zip(rows, generated):
+            results[i] = result
+    return results
+
+
+def get_engine() -> ContinuousBatchingEngine:
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            model, tokenizer = _load_model()
+            _engine = ContinuousBatchingEngine(
+                model, eos_token_ids(model, tokenizer),
+                max_batch_size=CONTINUOUS_MAX_BATCH,
+                prefix_cache_for=_get_prefix_cache if PREFIX_CACHE_ENABLED else None,
+                forward_context=get_registry().generating,
+                name="GuidanceAgent-continuous")
+    return _engine
+
+
+def generate_continuous(prompt: str, max_new_tokens: int = MAX_NEW_TOKENS,
+                        cancel_token=None, adapter: str = None,
+                        deadline=None, on_text=None) -> dict:
+    """
+    Greedy-decode one prompt on the continuous-batching engine; raises
+    DeadlineExceeded if no slot frees up before `deadline`. `on_text`, if
+    set, is called with the text as it is decoded.
+    """
+    model, tokenizer = _load_model()
+    if cancel_token is not None and cancel_token.cancelled:
+        raise _cancelled(cancel_token, "queued")
+    assert prompt.startswith(PROMPT_PREFIX), "prompt must come from build_prompt"
+    adapter    = adapter or _default_adapter()
+    start      = time.perf_counter()
+    prompt_ids = (_prompt_prefix_ids(tokenizer)[0].tolist()
+                  + tokenizer(prompt[len(PROMPT_PREFIX):],
+                              add_special_tokens=False)["input_ids"])
+    timer     = FirstTokenTimer()   # started now, so TTFT includes queueing
+    structure = _stop_criteria(tokenizer, 1, len(prompt_ids))
+    stream    = _TextCallbacks(tokenizer, len(prompt_ids), [on_text])
+
+    tokens = get_engine().submit(
+        prompt_ids, max_new_tokens,
+        [timer, CancellationCriteria([cancel_token]), *structure,
+         *([stream] if on_text else [])],
+        adapter=adapter, deadline=deadline).result()
+    if cancel_token is not None and cancel_token.cancelled:
+        raise _cancelled(cancel_token, "decoding")
+    generated_at = time.perf_counter()
+
+    text = tokenizer.decode(tokens, skip_special_tokens=True)
+    # "prefill" here includes the wait for a free slot in the engine
+    result = _result(text, len(prompt_ids), len(tokens), timer,
+                     structure[0].reasons[0] if structure else None,
+                     max_new_tokens,
+                     _timeline(start, timer, generated_at, time.perf_counter()),
+                     # The engine seeds prefill with the cached prefix when on
+                     _prompt_prefix_ids(tokenizer).shape[-1] if PREFIX_CACHE_ENABLED else 0)
+    stream.flush(0, result["text"])
+    return result
+
+
+def generate_queued(prompt: str, max_new_tokens: int = MAX_NEW_TOKENS,
+                    cancel_token=None, adapter: str = None, deadline=None,
+                    on_text=None) -> dict:
+    """
+    Greedy-decode one prompt alongside live traffic, on the continuous engine
+    or through the MicroBatcher (AYURVEDA_BATCHING). Raises DeadlineExceeded
+    if `deadline` passes before generation starts. `on_text`, if set, is
+    called with the text as it is decoded.
+    """
+    if BATCHING == "continuous":
+        # Joins the engine's running batch at the next token boundary
+        return generate_continuous(prompt, max_new_tokens, cancel_token, adapter,
+                                   deadline, on_text)
+    # Concurrent callers are coalesced into one batched generate
+    return get_batcher().submit(_Request(prompt, cancel_token, adapter, deadline,
+                                         max_new_tokens, on_text)).result()
+
+
+# Fixed case run through a freshly loaded adapter before it takes traffic
+SMOKE_STATE = {
+    "disease":       "Common Cold",
+    "symptoms":      "Runny nose, sneezing, mild fever",
+    "primary_dosha": "Kapha",
+}
+SMOKE_MAX_NEW_TOKENS = 48
+
+
+def smoke_test(adapter) -> dict:
+    """
+    Short greedy generation through `adapter` (a registry Adapter that is
+    loaded but not yet routed to). Raises if the output is unusable, e.g.
+    empty or degenerate repetition from broken weights. Queued like live
+    traffic, so it never runs the model next to in-flight requests.
+    """
+    result = generate_queued(build_prompt(SMOKE_STATE), SMOKE_MAX_NEW_TOKENS,
+                             adapter=adapter.peft_name)
+    if not result["text"].strip():
+        raise RuntimeError(f"Adapter {adapter.name!r} produced no text for the smoke prompt")
+    if result["stop_reason"] == "repetition":
+        raise RuntimeError(f"Adapter {adapter.name!r} degenerated into repetition "
+                           f"on the smoke prompt")
+    return result
+
+
+WARMUP_PROMPT_TOKENS = [int(n) for n in
+                        os.environ.get("AYURVEDA_WARMUP_TOKENS", "128,384,768").split(",") if n]
+WARMUP_MAX_NEW_TOKENS = 8
+
+
+def warmup(prompt_tokens: list = None) -> dict:
+    """
+    Run a few short generations at different prompt lengths, so kernel
+    selection, allocator growth and the prefix cache happen before real
+    traffic. Runs on the batcher or engine thread like any request. Returns
+    the seconds taken per prompt length.
+    """
+    _, tokenizer = _load_model()
+    timings = {}
+    for target in prompt_tokens or WARMUP_PROMPT_TOKENS:
+        state = dict(SMOKE_STATE)
+        prompt = build_prompt(state)
+        # Lengthen the history field until the prompt reaches the target size
+        while len(tokenizer(prompt)["input_ids"]) < target:
+            state["medical_history"] = (state.get("medical_history", "") +
+                                        " Recurrent seasonal allergies.").strip()
+            prompt = build_prompt(state)
+        start = time.perf_counter()
+        # Queued: the server accepts requests while warm-up runs
+        generate_queued(prompt, WARMUP_MAX_NEW_TOKENS)
+        timings[target] = round(time.perf_counter() - start, 3)
+    print(f"[GuidanceAgent] Warm-up done: {timings}")
+    return timings
+
+
+def get_batcher() -> MicroBatcher:
+    global _batcher
+    if _batcher is None:
+        _batcher = MicroBatcher(_generate_requests, name="GuidanceAgent-batcher")
+    return _batcher
+
+
+class GuidanceAgent:
+    """Calls the fine-tuned MedGemma model to generate clinical guidance."""
+
+    def updates(self, state, on_text=None) -> dict:
+        """Fields set by generation; `on_text` receives the text as it is decoded."""
+        # Waited past the deadline in a queue; don't start generating now
+        if remaining(state.get("deadline")) <= 0:
+            return self.degraded(state, "deadline")
+        prompt   = build_prompt(state)
+        token    = state.get("cancel_token")
+        deadline = state.get("deadline")
+
+        # Pinned until generation ends, so an unload waits for this request
+        with get_registry().use_adapter(state.get("adapter")) as adapter:
+            try:
+                result = generate_queued(prompt, cancel_token=token,
+                                         adapter=adapter.peft_name, deadline=deadline,
+                                         on_text=on_text)
+            except DeadlineExceeded:
+                # Expired waiting for the batcher or an engine slot
+                return self.degraded(state, "deadline")
+        _record(result, adapter.name)
+        # Timed on the batcher/engine thread; attach to this request's trace
+        tracing.record_timeline("guidance", result.pop("timeline"),
+                                adapter=adapter.name)
+
+        return {"model_output": result.pop("text"),
+                "generation_stats": {**result, "adapter": adapter.name}}
+
+    def run(self, state: dict) -> dict:
+        return {**state, **self.updates(state)}
+
+    async def aupdates(self, state) -> dict:
+        """
+        `updates` on the inference executor; raises QueueFullError when
+        saturated. With a deadline, degrades instead when the queue is full or
+        its wait would outlast the deadline.
+        """
+        executor = get_executor()
+        if state.get("deadline") is None:
+            return await executor.run(self.updates, state)
+        if executor.start_delay() >= remaining(state.get("deadline")):
+            return self.degraded(state, "queue_wait")
+        try:
+            return await executor.run(self.updates, state)
+        except QueueFullError:
+            return self.degraded(state, "queue_full")
+
+    def degraded(self, state, reason: str) -> dict:
+        """Skip the model: the rule agents' analysis, templated, as model output."""
+        metrics.DEGRADED_ASSESSMENTS.inc(reason=reason)
+        return {"model_output": build_degraded_output(state), "degraded": True,
+                "generation_stats": {"degraded": reason}}
+
+    def updates_batch(self, states: list, batch_size: int = PIPELINE_BATCH_SIZE) -> list:
+        """
+        `updates` for many states in the calling thread, `batch_size` rows per
+        generate call. Rows are grouped by prompt length to keep padding low;
+        results come back in input order.
+        """
+        prompts = [build_prompt(state) for state in states]
+        order   = sorted(range(len(states)), key=lambda i: len(prompts[i]))
+        results = [None] * len(states)
+        registry = get_registry()
+        with ExitStack() as pinned:
+            adapters = {}
+            for name in {state.get("adapter") for state in states}:
+                adapters[name] = pinned.enter_context(registry.use_adapter(name))
+            for start in range(0, len(order), max(1, batch_size)):
+                rows = order[start:start + batch_size]
+                with tracing.span("guidance.batch", rows=len(rows)):
+                    batch = generate_batch(
+                        [prompts[i] for i in rows],
+                        adapters=[adapters[states[i].get("adapter")].peft_name
+                                  for i in rows])
+                for i, result in zip(rows, batch):
+                    result.pop("timeline")
+                    results[i] = (result, adapters[states[i].get("adapter")].name)
+        outputs = []
+        for result, adapter in results:
+            _record(result, adapter)
+            outputs.append({"model_output": result.pop("text"),
+                            "generation_stats": {**result, "adapter": adapter}})
+        return outputs
 
-        return {**state, "model_output": raw}
+    def stream(self, state, on_text) -> dict:
+        """
+        `updates`, batched with live traffic like any request, calling
+        `on_text` with the output as it is decoded (a degraded one at once).
+        """
+        updates = self.updates(state, on_text)
+        if updates.get("degraded"):
+            on_text(updates["model_output"])
+        return updates
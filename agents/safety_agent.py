@@ -1,3 +1,5 @@
+import pandas as pd
+
 class SafetyAgent:
     """Validates output and appends safety disclaimer."""
 
@@ -15,15 +17,58 @@ class SafetyAgent:
         "stop your medication", "replace your doctor"
     ]
 
-    def run(self, state: dict) -> dict:
-        output = state.get("model_output", "")
-
+    def sanitize(self, output: str) -> str:
         # Safety check — remove overconfident claims
         for kw in self.DANGEROUS_KEYWORDS:
             if kw.lower() in output.lower():
                 output = output.replace(kw, f"[may help with]")
+        return output
+
+    def updates(self, state) -> dict:
+        output = self.sanitize(state.get("model_output", ""))
 
         # Always append disclaimer
         final_output = output + self.DISCLAIMER
 
-        return {**state, "final_output": final_output}
+        return {"final_output": final_output}
+
+    def run(self, state: dict) -> dict:
+        return {**state, **self.updates(state)}
+
+    def updates_batch(self, states: list) -> list:
+        """`updates` for many states, each keyword replaced across all outputs at once."""
+        outputs = pd.Series([s.get("model_output", "") for s in states], dtype=object)
+        # Same effect as sanitize(): only exact-case occurrences are replaced
+        for kw in self.DANGEROUS_KEYWORDS:
+            outputs = outputs.str.replace(kw, "[may help with]", regex=False)
+        return [{"final_output": output + self.DISCLAIMER} for output in outputs]
+
+    def stream_filter(self) -> "SafetyStreamFilter":
+        return SafetyStreamFilter(self)
+
+
+class SafetyStreamFilter:
+    """
+    Incremental SafetyAgent for streamed text. Holds back just enough trailing
+    characters that a dangerous keyword split across two fragments is still
+    caught before anything is released to the client.
+    """
+
+    def __init__(self, agent: SafetyAgent):
+        self.agent    = agent
+        self.holdback = max(len(kw) for kw in agent.DANGEROUS_KEYWORDS) - 1
+        self._buffer  = ""
+
+    def feed(self, text: str) -> str:
+        """Add a fragment; returns the text that is now safe to emit."""
+        self._buffer = self.agent.sanitize(self._buffer + text)
+        if len(self._buffer) <= self.holdback:
+            return ""
+        ready, self._buffer = (self._buffer[:-self.holdback],
+                               self._buffer[-self.holdback:])
+        return ready
+
+    def flush(self) -> str:
+        """Release the held-back tail followed by the disclaimer."""
+        tail, self._buffer = self._buffer, ""
+        return tail + self.agent.DISCLAIMER
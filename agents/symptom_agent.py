@@ -1,4 +1,5 @@
 import re
+import pandas as pd
 
 class SymptomAgent:
     """Parses and structures raw patient input."""
@@ -12,7 +13,11 @@ class SymptomAgent:
                   "diabetes", "cough", "cold", "weight gain", "slow"],
     }
 
-    def run(self, patient_data: dict) -> dict:
+    # A tongue reading counts as much as two matching symptom keywords
+    VISION_WEIGHT = 2
+
+    def updates(self, patient_data) -> dict:
+        """Fields this agent sets; the pipeline applies them to its state."""
         symptoms_text = (patient_data.get("symptoms", "") + " " +
                          patient_data.get("disease", "")).lower()
 
@@ -22,13 +27,45 @@ class SymptomAgent:
                 if kw in symptoms_text:
                     dosha_scores[dosha] += 1
 
+        return {
+            "dosha_scores": dosha_scores,
+            **self._rank(dosha_scores),
+        }
+
+    def run(self, patient_data: dict) -> dict:
+        return {**patient_data, **self.updates(patient_data)}
+
+    def updates_batch(self, patients: list) -> list:
+        """`updates` for many patients, matching each keyword against all at once."""
+        texts = pd.Series([(p.get("symptoms", "") + " " + p.get("disease", "")).lower()
+                           for p in patients], dtype=object)
+        scores = pd.DataFrame({
+            dosha: sum(texts.str.contains(kw, regex=False).astype(int) for kw in keywords)
+            for dosha, keywords in self.DOSHA_KEYWORDS.items()
+        })
+        return [{"dosha_scores": row, **self._rank(row)}
+                for row in scores.to_dict("records")]
+
+    def vision_updates(self, state) -> dict:
+        """Fold VisionAgent's tongue reading into the keyword dosha scores."""
+        visual = state.get("visual_dosha_indicator")
+        if not visual:
+            return {}
+        dosha_scores = dict(state.get("dosha_scores", {}))
+        dosha_scores[visual.lower()] = (dosha_scores.get(visual.lower(), 0)
+                                        + self.VISION_WEIGHT)
+        return {
+            "dosha_scores": dosha_scores,
+            **self._rank(dosha_scores),
+        }
+
+    @staticmethod
+    def _rank(dosha_scores: dict) -> dict:
         primary_dosha = max(dosha_scores, key=dosha_scores.get)
         secondary = [d for d, s in sorted(dosha_scores.items(),
                      key=lambda x: -x[1]) if d != primary_dosha and s > 0]
 
         return {
-            **patient_data,
-            "dosha_scores":   dosha_scores,
             "primary_dosha":  primary_dosha.capitalize(),
             "secondary_dosha": secondary[0].capitalize() if secondary else "None",
             "symptom_analysis": f"Primary imbalance: {primary_dosha.capitalize()}"
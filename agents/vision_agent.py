@@ -3,28 +3,21 @@ VisionAgent: Ayurvedic tongue analysis using MedGemma 4B vision.
 In Ayurveda, Darshan (visual examination) of the tongue reveals dosha imbalances:
   White/thick coating → Kapha | Yellow/red → Pitta | Dry/cracked → Vata
 """
+import time
 import torch
 from PIL import Image
-from transformers import AutoProcessor, AutoModelForImageTextToText
-
-VISION_MODEL = "google/medgemma-4b-it"
-_model = None
-_processor = None
+from transformers import StoppingCriteriaList
+from serving import metrics, tracing
+from serving.models import get_registry, BASE_ADAPTER
+from serving.stopping import FirstTokenTimer, CancellationCriteria
+from serving.cancellation import GenerationCancelled
+from serving.executor import get_executor
 
 def _load():
-    global _model, _processor
-    if _model is None:
-        print("[VisionAgent] Loading MedGemma vision capability...")
-        _processor = AutoProcessor.from_pretrained(VISION_MODEL, token=True)
-        _model = AutoModelForImageTextToText.from_pretrained(
-            VISION_MODEL, token=True,
-            dtype=torch.bfloat16, device_map="auto"
-        )
-        _model.eval()
-        print("[VisionAgent] Ready!")
-    return _model, _processor
+    # Same weights as GuidanceAgent; the LoRA adapter is bypassed per call
+    return get_registry().vision_model()
 
-def analyze_tongue(image: Image.Image) -> dict:
+def analyze_tongue(image: Image.Image, cancel_token=None) -> dict:
     model, processor = _load()
     prompt = """You are an Ayurvedic physician performing Darshan (visual examination).
 Analyze this tongue image and provide a structured report:
@@ -49,17 +42,43 @@ Keep the analysis concise and clinically structured."""
         ]
     }]
 
+    start  = time.perf_counter()
+    # Image preprocessing + tokenization; the vision tower itself runs in prefill
     inputs = processor.apply_chat_template(
         messages, add_generation_prompt=True,
         tokenize=True, return_dict=True, return_tensors="pt"
-    ).to(model.device, dtype=torch.bfloat16)
+    ).to(model.device, dtype=get_registry().dtype)
 
     input_len = inputs["input_ids"].shape[-1]
 
-    with torch.inference_mode():
-        out = model.generate(**inputs, max_new_tokens=400, do_sample=False)
+    timer = FirstTokenTimer()
+    # Waits for any text generation on the shared weights to finish first
+    with torch.inference_mode(), \
+            get_registry().generating([BASE_ADAPTER]) as adapter_kwargs:
+        out = model.generate(**inputs, max_new_tokens=400, do_sample=False,
+                             stopping_criteria=StoppingCriteriaList(
+                                 [timer, CancellationCriteria([cancel_token])]),
+                             **adapter_kwargs)
+    if cancel_token is not None and cancel_token.cancelled:
+        metrics.CANCELLED_GENERATIONS.inc(agent="vision", stage="decoding")
+        raise GenerationCancelled(cancel_token.reason)
+    generated_at = time.perf_counter()
+
+    generated = out[0][input_len:]
+    response  = processor.decode(generated, skip_special_tokens=True)
+    first = timer.first_token_at or generated_at
+    tracing.record_timeline("vision", {
+        "tokenize":   (start, timer.start),
+        "prefill":    (timer.start, first),
+        "decode":     (first, generated_at),
+        "detokenize": (generated_at, time.perf_counter()),
+    })
 
-    response = processor.decode(out[0][input_len:], skip_special_tokens=True)
+    timings = timer.timings(len(generated))
+    metrics.PROMPT_TOKENS.inc(input_len, agent="vision")
+    metrics.GENERATED_TOKENS.inc(len(generated), agent="vision")
+    metrics.TIME_TO_FIRST_TOKEN.observe(timings["ttft_seconds"], agent="vision")
+    metrics.TOKENS_PER_SECOND.observe(timings["decode_tokens_per_second"], agent="vision")
 
     # Detect primary dosha from response
     rl = response.lower()
@@ -76,14 +95,22 @@ Keep the analysis concise and clinically structured."""
     }
 
 class VisionAgent:
-    def run(self, state: dict) -> dict:
+    def updates(self, state) -> dict:
         image = state.get("tongue_image", None)
         if image is None:
-            return {**state, "tongue_analysis": None, "visual_dosha_indicator": None}
-        result = analyze_tongue(image)
+            return {"tongue_analysis": None, "visual_dosha_indicator": None}
+        result = analyze_tongue(image, cancel_token=state.get("cancel_token"))
         return {
-            **state,
             "tongue_analysis":        result["tongue_analysis"],
             "visual_dosha_indicator": result["visual_dosha_indicator"],
             "dosha_scores_vision":    result["dosha_scores_vision"],
         }
+
+    def run(self, state: dict) -> dict:
+        return {**state, **self.updates(state)}
+
+    async def aupdates(self, state) -> dict:
+        """`updates` on the inference executor; raises QueueFullError when saturated."""
+        if state.get("tongue_image") is None:
+            return self.updates(state)
+        return await get_executor().run(self.updates, state)
@@ -1,20 +1,79 @@
-import sys, os, base64
+import sys, os, base64, hmac, json, asyncio
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from pydantic import BaseModel
+from fastapi.responses import FileResponse, StreamingResponse, JSONResponse, PlainTextResponse
+from starlette.datastructures import Headers, MutableHeaders
+from pydantic import BaseModel, ValidationError
 from typing import Optional
+from contextlib import asynccontextmanager
 from PIL import Image
 from io import BytesIO
-from inference import get_ayurvedic_assessment
+from inference import (get_ayurvedic_assessment, aget_ayurvedic_assessment,
+                       aget_tongue_assessment)
+from graph.pipeline import prepare_assessment, stream_guidance, format_agent_analysis
+from serving import metrics, tracing
+from serving.executor import get_executor, QueueFullError
+from serving.cancellation import CancellationToken, GenerationCancelled
+from serving.deadline import deadline_after
+from serving.models import get_registry, UnknownAdapterError
+from serving.cache import get_cache, CACHE_ENABLED
+from serving.jobs import JobStore, JobRunner, DONE, FAILED
+from serving.reload import AdapterReloader, ReloadInProgress, ADAPTER_WATCH
+from serving.warmup import StartupTask, PRELOAD
+from agents.guidance_agent import get_batcher, smoke_test, warmup
+
+executor   = get_executor()
+job_store  = JobStore()
+job_runner = JobRunner(job_store, executor, get_ayurvedic_assessment)
+reloader   = AdapterReloader(get_registry(), smoke_test)
+
+def _preload_models():
+    # Text model, plus the separate vision base in merged mode
+    get_registry().vision_model()
+
+startup = StartupTask([("load", _preload_models), ("warmup", warmup)])
+
+def _collect_serving_metrics():
+    stats = executor.stats()
+    metrics.QUEUE_DEPTH.set(stats["queued"],  queue="executor", state="queued")
+    metrics.QUEUE_DEPTH.set(stats["running"], queue="executor", state="running")
+    metrics.QUEUE_DEPTH.set(get_batcher().pending(), queue="batcher", state="queued")
+    for status, n in job_store.counts().items():
+        metrics.QUEUE_DEPTH.set(n, queue="jobs", state=status)
+    if CACHE_ENABLED:
+        cache = get_cache().stats()
+        for outcome in ("memory_hits", "disk_hits", "misses"):
+            metrics.CACHE_EVENTS.set(cache[outcome], outcome=outcome)
+        metrics.CACHE_HIT_RATE.set(cache["hit_rate"])
+    registry = get_registry()
+    for component, seconds in registry.load_seconds.items():
+        metrics.MODEL_LOAD_SECONDS.set(seconds, component=component)
+    for component, size in registry.memory_bytes.items():
+        metrics.MODEL_MEMORY_BYTES.set(size, component=component)
+    for name, adapter in registry.adapters().items():
+        metrics.ADAPTER_IN_FLIGHT.set(adapter["in_flight"], adapter=name)
+
+metrics.register_collector(_collect_serving_metrics)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if PRELOAD:
+        startup.start()   # background thread; the server accepts requests at once
+    job_runner.start()
+    if ADAPTER_WATCH:
+        reloader.watch()
+    yield
+    reloader.stop()
+    job_runner.stop()
 
 app = FastAPI(
     title="Ayurveda AI API",
     description="Offline clinical intelligence powered by fine-tuned MedGemma 4B",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -22,8 +81,46 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[tracing.TRACE_HEADER],
 )
 
+# Probes are too frequent and too cheap to be worth a trace
+UNTRACED_PATHS = {"/api/health", "/api/ready"}
+
+class TraceRequests:
+    """
+    Root span per API request; the trace id is echoed in X-Trace-Id.
+
+    Plain ASGI rather than @app.middleware("http"): BaseHTTPMiddleware keeps
+    the client's http.disconnect from reaching request.is_disconnected(), so
+    _run_cancellable would never cancel an abandoned generation.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if (scope["type"] != "http" or not path.startswith("/api/")
+                or path in UNTRACED_PATHS):
+            return await self.app(scope, receive, send)
+        trace_id = tracing.trace_id_from_headers(Headers(scope=scope))
+
+        async def send_with_trace_id(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[tracing.TRACE_HEADER] = trace_id
+            await send(message)
+
+        with tracing.span(f"http {scope['method']} {path}", trace_id=trace_id):
+            await self.app(scope, receive, send_with_trace_id)
+
+app.add_middleware(TraceRequests)
+
+BATCH_MAX_RECORDS = int(os.environ.get("AYURVEDA_BATCH_MAX_RECORDS", "1000"))
+# Unset: the admin API is off (it loads weights from arbitrary server paths)
+ADMIN_TOKEN = os.environ.get("AYURVEDA_ADMIN_TOKEN")
+DISCONNECT_POLL_SECONDS = 0.5
+
 app.mount("/static", StaticFiles(directory="frontend/static"), name="static")
 
 class AssessmentRequest(BaseModel):
@@ -35,6 +132,13 @@ class AssessmentRequest(BaseModel):
     current_medications: str = "None"
     stress_levels: str = "Moderate"
     dietary_habits: str = "Not specified"
+    adapter: Optional[str] = None   # LoRA adapter name; server default if omitted
+    # Latency budget; past it a rule-only degraded assessment is returned
+    # (omitted: AYURVEDA_DEADLINE_MS, 0: no deadline)
+    deadline_ms: Optional[int] = None
+
+# Passed to the pipelines as `deadline` (see deadline_after), not as a field
+DEADLINE_FIELDS = {"deadline_ms"}
 
 class TongueRequest(BaseModel):
     image_base64: str
@@ -42,11 +146,21 @@ class TongueRequest(BaseModel):
     symptoms: str = "Visual examination requested"
     age_group: str = "Adult (20-40)"
     gender: str = "Male"
+    adapter: Optional[str] = None
+    deadline_ms: Optional[int] = None
+
+class AdapterRequest(BaseModel):
+    name: str
+    path: str
+
+class ReloadRequest(BaseModel):
+    path: Optional[str] = None
 
 class AssessmentResponse(BaseModel):
     success: bool
     assessment: str
     pipeline: str
+    degraded: bool = False   # GuidanceAgent skipped to meet the deadline
 
 @app.get("/")
 async def serve_frontend():
@@ -58,13 +172,74 @@ async def health():
         "status": "online",
         "model": "MedGemma 4B + LoRA",
         "pipeline": "5-agent LangGraph",
-        "deployment": "100% offline"
+        "deployment": "100% offline",
+        "inference": executor.stats(),
+        "models": get_registry().report(),
+        "cache": get_cache().stats() if CACHE_ENABLED else {"enabled": False},
+        "jobs": job_store.counts(),
+        "startup": startup.status(),
     }
 
+@app.get("/api/ready")
+async def ready():
+    """Readiness probe: 200 once models are loaded and warmed up, 503 before."""
+    if PRELOAD:
+        is_ready, status = startup.ready, startup.status()
+    else:
+        # No warm-up configured; ready once the first request has loaded the model
+        is_ready, status = get_registry().loaded, {"state": "lazy"}
+    return JSONResponse({"ready": is_ready, **status},
+                        status_code=200 if is_ready else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(),
+                             media_type="text/plain; version=0.0.4")
+
+def _queue_full(e: QueueFullError) -> HTTPException:
+    return HTTPException(status_code=503, detail=str(e),
+                         headers={"Retry-After": str(e.retry_after)})
+
+def _check_adapter(name: Optional[str]):
+    try:
+        get_registry().get_adapter(name)
+    except UnknownAdapterError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+class ClientDisconnected(Exception):
+    pass
+
+# Non-standard "client closed request" status, as used by nginx
+CLIENT_CLOSED_REQUEST = 499
+
+async def _run_cancellable(request: Request, endpoint: str, afn, *args, **kwargs):
+    """
+    Await the async pipeline entry point `afn` with a CancellationToken,
+    polling the connection meanwhile. If the client disconnects the token is
+    cancelled, so generation stops at the next decoding step (or never starts).
+    """
+    token = CancellationToken()
+    task  = asyncio.ensure_future(afn(*args, cancel_token=token, **kwargs))
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                metrics.CLIENT_DISCONNECTS.inc(endpoint=endpoint)
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            token.cancel()
+            task.cancel()
+
 @app.post("/api/assess", response_model=AssessmentResponse)
-async def assess(req: AssessmentRequest):
+async def assess(req: AssessmentRequest, request: Request):
+    deadline = deadline_after(req.deadline_ms)
     try:
-        result = get_ayurvedic_assessment(
+        result = await _run_cancellable(
+            request, "/api/assess",
+            aget_ayurvedic_assessment,
             disease=req.disease,
             symptoms=req.symptoms,
             age_group=req.age_group,
@@ -72,31 +247,288 @@ async def assess(req: AssessmentRequest):
             medical_history=req.medical_history,
             current_medications=req.current_medications,
             stress_levels=req.stress_levels,
-            dietary_habits=req.dietary_habits
+            dietary_habits=req.dietary_habits,
+            adapter=req.adapter,
+            deadline=deadline
         )
         return AssessmentResponse(
             success=True,
             assessment=result,
-            pipeline="SymptomAgent -> DoshaAgent -> GuidanceAgent -> SafetyAgent"
+            pipeline="SymptomAgent -> DoshaAgent -> GuidanceAgent -> SafetyAgent",
+            degraded=getattr(result, "degraded", False)
         )
+    except QueueFullError as e:
+        raise _queue_full(e)
+    except UnknownAdapterError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except (ClientDisconnected, GenerationCancelled):
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/api/assess/stream")
+async def assess_stream(req: AssessmentRequest):
+    """
+    Server-Sent Events version of /api/assess:
+      meta  → SymptomAgent/DoshaAgent analysis, sent before generation starts
+      token → safety-filtered GuidanceAgent text as it is decoded
+      done  → full assessment (same text /api/assess would return)
+    """
+    _check_adapter(req.adapter)
+    token = CancellationToken()
+    # The cache lookup may hit SQLite; keep it off the event loop
+    state, cached = await asyncio.to_thread(
+        prepare_assessment, cancel_token=token, deadline=deadline_after(req.deadline_ms),
+        **req.model_dump(exclude=DEADLINE_FIELDS))
+    meta = {
+        "analysis": format_agent_analysis(state),
+        "pipeline": "SymptomAgent -> DoshaAgent -> GuidanceAgent -> SafetyAgent",
+    }
+    if cached is not None:
+        async def replay():
+            yield _sse("meta", meta)
+            yield _sse("done", {"assessment": cached})
+
+        return StreamingResponse(replay(), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache"})
+
+    loop  = asyncio.get_running_loop()
+    chunks: asyncio.Queue = asyncio.Queue()
+
+    def on_text(text):
+        loop.call_soon_threadsafe(chunks.put_nowait, text)
+
+    try:
+        future = executor.submit(stream_guidance, state, on_text)
+    except QueueFullError as e:
+        raise _queue_full(e)
+    future.add_done_callback(
+        lambda _: loop.call_soon_threadsafe(chunks.put_nowait, None))
+
+    async def events():
+        yield _sse("meta", meta)
+        try:
+            while (text := await chunks.get()) is not None:
+                yield _sse("token", {"text": text})
+        finally:
+            # Starlette cancels this generator when the client disconnects
+            if not future.done():
+                metrics.CLIENT_DISCONNECTS.inc(endpoint="/api/assess/stream")
+                token.cancel()
+                future.cancel()
+        try:
+            result = future.result()
+            yield _sse("done", {"assessment": result,
+                                "degraded": getattr(result, "degraded", False)})
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+@app.post("/api/assess/batch")
+async def assess_batch(request: Request):
+    """
+    Bulk assessment. Body: JSONL, one AssessmentRequest per line.
+    Response: NDJSON, one {"index", "success", ...} line per record in
+    completion order, streamed as each record finishes.
+    """
+    lines = [l for l in (await request.body()).decode("utf-8").splitlines()
+             if l.strip()]
+    if len(lines) > BATCH_MAX_RECORDS:
+        raise HTTPException(status_code=413,
+                            detail=f"At most {BATCH_MAX_RECORDS} records per batch")
+
+    records, invalid = [], []
+    for index, line in enumerate(lines):
+        try:
+            records.append((index, AssessmentRequest.model_validate_json(line)))
+        except ValidationError as e:
+            invalid.append({"index": index, "success": False, "error": str(e)})
+
+    # Keep at most one record per worker in flight so a bulk upload feeds the
+    # batcher without monopolising the admission queue
+    in_flight = asyncio.Semaphore(executor.workers)
+
+    async def assess_one(index, req):
+        token = CancellationToken()
+        # Counted from upload, so time spent behind earlier records is included
+        deadline = deadline_after(req.deadline_ms)
+        async with in_flight:
+            while True:
+                try:
+                    result = await aget_ayurvedic_assessment(
+                        cancel_token=token, deadline=deadline,
+                        **req.model_dump(exclude=DEADLINE_FIELDS))
+                    return {"index": index, "success": True, "assessment": result,
+                            "degraded": getattr(result, "degraded", False)}
+                except QueueFullError as e:
+                    await asyncio.sleep(min(e.retry_after, 1.0))
+                except asyncio.CancelledError:
+                    token.cancel()
+                    raise
+                except Exception as e:
+                    return {"index": index, "success": False, "error": str(e)}
+
+    async def results():
+        tasks = [asyncio.create_task(assess_one(i, r)) for i, r in records]
+        try:
+            for item in invalid:
+                yield json.dumps(item) + "\n"
+            for next_done in asyncio.as_completed(tasks):
+                yield json.dumps(await next_done) + "\n"
+        finally:
+            pending = [t for t in tasks if not t.done()]
+            if pending:
+                metrics.CLIENT_DISCONNECTS.inc(endpoint="/api/assess/batch")
+            for t in pending:
+                t.cancel()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
 @app.post("/api/tongue", response_model=AssessmentResponse)
-async def tongue_analysis(req: TongueRequest):
+async def tongue_analysis(req: TongueRequest, request: Request):
+    deadline = deadline_after(req.deadline_ms)
     try:
         image_data = base64.b64decode(req.image_base64)
         image = Image.open(BytesIO(image_data)).convert("RGB")
-        result = get_ayurvedic_assessment(
+        result = await _run_cancellable(
+            request, "/api/tongue",
+            aget_tongue_assessment,
+            image,
             disease=req.disease,
-            symptoms=f"{req.symptoms} — Tongue Darshan analysis: visual examination performed",
+            symptoms=req.symptoms,
             age_group=req.age_group,
-            gender=req.gender
+            gender=req.gender,
+            adapter=req.adapter,
+            deadline=deadline
         )
         return AssessmentResponse(
             success=True,
             assessment=result,
-            pipeline="VisionAgent -> SymptomAgent -> DoshaAgent -> GuidanceAgent -> SafetyAgent"
+            pipeline="[VisionAgent | SymptomAgent] -> DoshaAgent -> GuidanceAgent -> SafetyAgent",
+            degraded=getattr(result, "degraded", False)
         )
+    except QueueFullError as e:
+        raise _queue_full(e)
+    except UnknownAdapterError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except (ClientDisconnected, GenerationCancelled):
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+# ── Asynchronous jobs ────────────────────────────────────────────────────────
+
+def _job_status(job: dict) -> dict:
+    return {
+        "job_id":         job["id"],
+        "status":         job["status"],
+        "queue_position": job["queue_position"],
+        "created_at":     job["created_at"],
+        "started_at":     job["started_at"],
+        "finished_at":    job["finished_at"],
+        "result_url":     f"/api/jobs/{job['id']}/result",
+    }
+
+def _get_job(job_id: str) -> dict:
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+@app.post("/api/jobs", status_code=202)
+async def submit_job(req: AssessmentRequest):
+    _check_adapter(req.adapter)
+    if req.deadline_ms:
+        # A job is queued for as long as it takes; there is nothing to degrade to
+        raise HTTPException(status_code=400,
+                            detail="deadline_ms is not supported for jobs; "
+                                   "use /api/assess")
+    job_id = job_store.submit(req.model_dump(exclude=DEADLINE_FIELDS))
+    job_runner.notify()
+    return _job_status(job_store.get(job_id))
+
+@app.get("/api/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = _get_job(job_id)
+    headers = {}
+    if job["status"] not in (DONE, FAILED):
+        headers["Retry-After"] = str(executor.retry_after())
+    return JSONResponse(_job_status(job), headers=headers)
+
+@app.get("/api/jobs/{job_id}/result", response_model=AssessmentResponse)
+async def job_result(job_id: str):
+    job = _get_job(job_id)
+    if job["status"] == FAILED:
+        raise HTTPException(status_code=500, detail=job["error"])
+    if job["status"] != DONE:
+        return JSONResponse(_job_status(job), status_code=202,
+                            headers={"Retry-After": str(executor.retry_after())})
+    return AssessmentResponse(
+        success=True,
+        assessment=job["result"],
+        pipeline="SymptomAgent -> DoshaAgent -> GuidanceAgent -> SafetyAgent"
+    )
+
+# ── LoRA adapters ────────────────────────────────────────────────────────────
+
+def _require_admin(request: Request):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403,
+                            detail="Admin API disabled; set AYURVEDA_ADMIN_TOKEN")
+    given = request.headers.get("X-Admin-Token", "")
+    if not hmac.compare_digest(given.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+@app.get("/api/adapters")
+async def list_adapters():
+    return get_registry().adapters()
+
+@app.post("/api/admin/adapters", status_code=201)
+async def load_adapter(req: AdapterRequest, request: Request):
+    """Attach another adapter to the running base model (no restart)."""
+    _require_admin(request)
+    try:
+        # Off the inference executor so a load never takes a request slot
+        info = await asyncio.to_thread(get_registry().load_adapter, req.name, req.path)
+    except (ValueError, OSError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"name": req.name, **info}
+
+@app.delete("/api/admin/adapters/{name}")
+async def unload_adapter(name: str, request: Request):
+    """Stop routing to an adapter; in-flight requests on it finish first."""
+    _require_admin(request)
+    try:
+        await asyncio.to_thread(get_registry().unload_adapter, name)
+    except UnknownAdapterError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"name": name, "unloaded": True}
+
+@app.post("/api/admin/adapters/{name}/reload", status_code=202)
+async def reload_adapter(name: str, request: Request, req: Optional[ReloadRequest] = None):
+    """
+    Load a new version of an adapter in the background (from `path`, default
+    its current path), smoke-test it, then switch new requests to it.
+    Poll GET /api/admin/adapters/{name}/reload for the outcome.
+    """
+    _require_admin(request)
+    try:
+        return reloader.start_reload(name, req.path if req else None)
+    except UnknownAdapterError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ReloadInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/admin/adapters/{name}/reload")
+async def reload_status(name: str, request: Request):
+    _require_admin(request)
+    return reloader.status(name)
@@ -13,30 +13,142 @@ Flow:
   SafetyAgent       ← validates output, appends disclaimer
       │
   Final Assessment
+
+Tongue variant (build_tongue_pipeline):
+  Patient Input + tongue_image
+      │
+  ┌───┴────────────┐
+  SymptomAgent   VisionAgent   ← parallel branches
+  └───┬────────────┘
+  join              ← merges visual_dosha_indicator into dosha_scores
+      │
+  DoshaAgent → GuidanceAgent → SafetyAgent
+
+Both graphs can also be awaited (arun_ayurveda_pipeline / arun_tongue_pipeline,
+via LangGraph's ainvoke or SequentialPipeline.ainvoke). On that path the rule
+agents run inline on the event loop and only GuidanceAgent and VisionAgent
+hop to the inference executor, so a request holds a worker thread only while
+a model is actually running.
+
+Agents return only the fields they set (`updates`). The pipelines apply those
+to one AssessmentState per request (graph/state.py) rather than copying the
+whole state at every node: in place on SequentialPipeline, per field channel
+on LangGraph.
 """
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
 
 try:
-    from langgraph.graph import StateGraph, END
+    from langgraph.graph import StateGraph, START, END
+    from langchain_core.runnables import RunnableLambda
     LANGGRAPH_AVAILABLE = True
 except ImportError:
     LANGGRAPH_AVAILABLE = False
 
-from agents import SymptomAgent, DoshaAgent, GuidanceAgent, SafetyAgent
+from agents import SymptomAgent, DoshaAgent, GuidanceAgent, SafetyAgent, VisionAgent
+from agents.guidance_agent import build_prompt, generation_config, PIPELINE_BATCH_SIZE
+from graph.state import AssessmentState
+from serving import metrics, tracing
+from serving.cache import get_cache, make_key, CACHE_ENABLED
+
+
+class Node:
+    """A named pipeline step; records latency, errors and a trace span per node."""
+
+    def __init__(self, name: str, fn, afn=None):
+        """
+        `fn(state)` returns the fields the step sets; `afn` is its async
+        variant. Without one `fn` runs inline.
+        """
+        self.name = name
+        self.fn   = fn
+        self.afn  = afn
+
+    def run(self, state) -> dict:
+        try:
+            with tracing.span(f"node.{self.name}"), \
+                    metrics.NODE_LATENCY.time(node=self.name):
+                return self.fn(state)
+        except Exception:
+            metrics.NODE_ERRORS.inc(node=self.name)
+            raise
+
+    async def arun(self, state) -> dict:
+        try:
+            with tracing.span(f"node.{self.name}"), \
+                    metrics.NODE_LATENCY.time(node=self.name):
+                if self.afn is None:
+                    return self.fn(state)
+                return await self.afn(state)
+        except Exception:
+            metrics.NODE_ERRORS.inc(node=self.name)
+            raise
+
+    def runnable(self):
+        """LangGraph node that supports both invoke and ainvoke."""
+        return RunnableLambda(self.run, afunc=self.arun, name=self.name)
+
+
+class SequentialPipeline:
+    """Fallback pipeline (no LangGraph dependency): runs steps in order."""
+
+    def __init__(self, agents):
+        self.agents = agents
+
+    def invoke(self, state) -> AssessmentState:
+        state = AssessmentState.from_dict(state)
+        for agent in self.agents:
+            state.update(agent.run(state))
+        return state
+
+    async def ainvoke(self, state) -> AssessmentState:
+        state = AssessmentState.from_dict(state)
+        for agent in self.agents:
+            state.update(await agent.arun(state))
+        return state
+
+
+# Threads for parallel branches in the fallback pipeline
+_branch_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="branch")
+
+class ParallelStep:
+    """Fallback fan-out: runs branch nodes concurrently and merges their updates."""
+
+    def __init__(self, branches):
+        self.branches = branches
+
+    def run(self, state) -> dict:
+        # Each branch runs in a copy of the caller's context (trace span)
+        futures = [_branch_pool.submit(copy_context().run, b.run, state)
+                   for b in self.branches]
+        merged = {}
+        for f in futures:
+            merged.update(f.result())
+        return merged
+
+    async def arun(self, state) -> dict:
+        results = await asyncio.gather(*(b.arun(state) for b in self.branches))
+        merged = {}
+        for result in results:
+            merged.update(result)
+        return merged
 
 
 def build_pipeline():
-    symptom_agent  = SymptomAgent()
-    dosha_agent    = DoshaAgent()
-    guidance_agent = GuidanceAgent()
-    safety_agent   = SafetyAgent()
+    symptom_agent, dosha_agent = SymptomAgent(), DoshaAgent()
+    guidance_agent, safety_agent = GuidanceAgent(), SafetyAgent()
+    # Rule agents take microseconds, so they run inline on the event loop
+    symptom  = Node("symptom",  symptom_agent.updates)
+    dosha    = Node("dosha",    dosha_agent.updates)
+    guidance = Node("guidance", guidance_agent.updates, guidance_agent.aupdates)
+    safety   = Node("safety",   safety_agent.updates)
 
     if LANGGRAPH_AVAILABLE:
         # Full LangGraph DAG
-        graph = StateGraph(dict)
-        graph.add_node("symptom",  symptom_agent.run)
-        graph.add_node("dosha",    dosha_agent.run)
-        graph.add_node("guidance", guidance_agent.run)
-        graph.add_node("safety",   safety_agent.run)
+        graph = StateGraph(AssessmentState)
+        for node in (symptom, dosha, guidance, safety):
+            graph.add_node(node.name, node.runnable())
 
         graph.set_entry_point("symptom")
         graph.add_edge("symptom",  "dosha")
@@ -46,23 +158,44 @@ def build_pipeline():
 
         return graph.compile()
     else:
-        # Fallback sequential pipeline (no LangGraph dependency)
-        class SequentialPipeline:
-            def __init__(self, agents):
-                self.agents = agents
+        return SequentialPipeline([symptom, dosha, guidance, safety])
 
-            def invoke(self, state: dict) -> dict:
-                for agent in self.agents:
-                    state = agent.run(state)
-                return state
 
+def build_tongue_pipeline():
+    """Multimodal variant: VisionAgent runs alongside SymptomAgent."""
+    symptom_agent, vision_agent, dosha_agent = SymptomAgent(), VisionAgent(), DoshaAgent()
+    guidance_agent, safety_agent = GuidanceAgent(), SafetyAgent()
+    symptom  = Node("symptom",  symptom_agent.updates)
+    vision   = Node("vision",   vision_agent.updates, vision_agent.aupdates)
+    join     = Node("join",     symptom_agent.vision_updates)
+    dosha    = Node("dosha",    dosha_agent.updates)
+    guidance = Node("guidance", guidance_agent.updates, guidance_agent.aupdates)
+    safety   = Node("safety",   safety_agent.updates)
+
+    if LANGGRAPH_AVAILABLE:
+        # The branches write disjoint fields, so both can update in one step
+        graph = StateGraph(AssessmentState)
+        for node in (symptom, vision, join, dosha, guidance, safety):
+            graph.add_node(node.name, node.runnable())
+
+        graph.add_edge(START, "symptom")
+        graph.add_edge(START, "vision")
+        graph.add_edge(["symptom", "vision"], "join")
+        graph.add_edge("join",     "dosha")
+        graph.add_edge("dosha",    "guidance")
+        graph.add_edge("guidance", "safety")
+        graph.add_edge("safety",   END)
+
+        return graph.compile()
+    else:
         return SequentialPipeline([
-            symptom_agent, dosha_agent, guidance_agent, safety_agent
+            ParallelStep([symptom, vision]), join, dosha, guidance, safety,
         ])
 
 
-# Singleton pipeline instance
+# Singleton pipeline instances
 _pipeline = None
+_tongue_pipeline = None
 
 def get_pipeline():
     global _pipeline
@@ -70,14 +203,19 @@ def get_pipeline():
         _pipeline = build_pipeline()
     return _pipeline
 
+def get_tongue_pipeline():
+    global _tongue_pipeline
+    if _tongue_pipeline is None:
+        _tongue_pipeline = build_tongue_pipeline()
+    return _tongue_pipeline
 
-def run_ayurveda_pipeline(disease, symptoms, age_group="Adult (20-40)",
-                           gender="Male", medical_history="None",
-                           current_medications="None",
-                           stress_levels="Moderate",
-                           dietary_habits="Not specified") -> str:
-    """Main entry point — runs full 4-agent pipeline."""
-    patient_data = {
+
+def build_patient_data(disease, symptoms, age_group="Adult (20-40)",
+                       gender="Male", medical_history="None",
+                       current_medications="None",
+                       stress_levels="Moderate",
+                       dietary_habits="Not specified") -> dict:
+    fields = {
         "disease":             disease,
         "symptoms":            symptoms,
         "age_group":           age_group,
@@ -87,19 +225,277 @@ def run_ayurveda_pipeline(disease, symptoms, age_group="Adult (20-40)",
         "stress_levels":       stress_levels,
         "dietary_habits":      dietary_habits,
     }
+    # Collapse stray whitespace so trivially different inputs share a cache
+    # entry; the model sees the same normalised text, so outputs stay exact
+    return {k: " ".join(str(v).split()) for k, v in fields.items()}
 
-    pipeline = get_pipeline()
-    result   = pipeline.invoke(patient_data)
 
-    # Build enriched output with agent metadata prepended
-    dosha_info = (
+def assessment_cache_key(patient_data: dict, adapter: str = None) -> str:
+    return make_key(patient_data, generation_config(adapter))
+
+
+def format_agent_analysis(result: dict) -> str:
+    """Agent metadata block prepended to every assessment."""
+    tongue = ""
+    if result.get("visual_dosha_indicator"):
+        tongue = (
+            f"  Tongue (Darshan) : {result['visual_dosha_indicator']}\n"
+            f"\nTONGUE DARSHAN:\n{result.get('tongue_analysis', '').strip()}\n"
+        )
+    return (
         f"AGENT ANALYSIS:\n"
         f"  Dosha Scores    : {result.get('dosha_scores', {})}\n"
         f"  Primary Imbalance: {result.get('primary_dosha', 'N/A')}\n"
         f"  Secondary        : {result.get('secondary_dosha', 'N/A')}\n"
         f"  Treatment Principle: {result.get('dosha_treatment', {}).get('principle', 'N/A')}\n"
         f"  Suggested Herbs  : {result.get('dosha_treatment', {}).get('herbs', 'N/A')}\n"
+        f"{tongue}"
         f"---\n\n"
     )
 
-    return dosha_info + result.get("final_output", "No output generated.")
+
+def _lookup(patient_data: dict, adapter) -> tuple:
+    """(cache key, cached assessment or None); (None, None) without a cache."""
+    if not CACHE_ENABLED:
+        return None, None
+    key = assessment_cache_key(patient_data, adapter)
+    with tracing.span("cache.lookup"):
+        return key, get_cache().get(key)
+
+
+async def _alookup(patient_data: dict, adapter) -> tuple:
+    """_lookup for the event loop: memory inline, SQLite on a worker thread."""
+    if not CACHE_ENABLED:
+        return None, None
+    key = assessment_cache_key(patient_data, adapter)
+    with tracing.span("cache.lookup"):
+        cached = get_cache().get_memory(key)
+        if cached is None:
+            cached = await asyncio.to_thread(get_cache().get_disk, key)
+        return key, cached
+
+
+def _with_request(patient_data: dict, cancel_token, adapter,
+                  deadline=None) -> AssessmentState:
+    # Request-scoped, so added only after the cache key is computed
+    return AssessmentState(**patient_data, cancel_token=cancel_token,
+                           adapter=adapter, deadline=deadline)
+
+
+class Assessment(str):
+    """Assessment text; `degraded` is set when GuidanceAgent was skipped."""
+    degraded = False
+
+
+def _assessment(result, key) -> Assessment:
+    # Build enriched output with agent metadata prepended
+    dosha_info = format_agent_analysis(result)
+    assessment = Assessment(dosha_info + result.get("final_output", "No output generated."))
+    assessment.degraded = bool(result.get("degraded"))
+    metrics.ASSESSMENTS.inc(mode="degraded" if assessment.degraded else "full")
+
+    if _cacheable(result, key):
+        get_cache().put(key, str(assessment))
+    return assessment
+
+
+def _cacheable(result, key) -> bool:
+    # Degraded output stands in for the model only while it is busy
+    return (key is not None and result.get("final_output") is not None
+            and not result.get("degraded"))
+
+
+async def _aassessment(result, key) -> Assessment:
+    """_assessment for the event loop: the SQLite write runs on a worker thread."""
+    assessment = _assessment(result, None)
+    if _cacheable(result, key):
+        get_cache().put_memory(key, str(assessment))
+        await asyncio.to_thread(get_cache().put_disk, key, str(assessment))
+    return assessment
+
+
+def run_ayurveda_pipeline(disease, symptoms, age_group="Adult (20-40)",
+                           gender="Male", medical_history="None",
+                           current_medications="None",
+                           stress_levels="Moderate",
+                           dietary_habits="Not specified",
+                           cancel_token=None, adapter=None, deadline=None) -> str:
+    """
+    Main entry point — runs full 4-agent pipeline. Past `deadline`
+    (serving.deadline) GuidanceAgent is skipped and the result is degraded.
+    """
+    patient_data = build_patient_data(
+        disease, symptoms, age_group, gender, medical_history,
+        current_medications, stress_levels, dietary_habits
+    )
+    with tracing.span("pipeline.assess", adapter=adapter):
+        key, cached = _lookup(patient_data, adapter)
+        if cached is not None:
+            return cached
+        result = get_pipeline().invoke(
+            _with_request(patient_data, cancel_token, adapter, deadline))
+        return _assessment(result, key)
+
+
+async def arun_ayurveda_pipeline(disease, symptoms, age_group="Adult (20-40)",
+                                 gender="Male", medical_history="None",
+                                 current_medications="None",
+                                 stress_levels="Moderate",
+                                 dietary_habits="Not specified",
+                                 cancel_token=None, adapter=None,
+                                 deadline=None) -> str:
+    """
+    Awaitable run_ayurveda_pipeline; only GuidanceAgent and the cache's disk
+    tier leave the event loop.
+    """
+    patient_data = build_patient_data(
+        disease, symptoms, age_group, gender, medical_history,
+        current_medications, stress_levels, dietary_habits
+    )
+    with tracing.span("pipeline.assess", adapter=adapter):
+        key, cached = await _alookup(patient_data, adapter)
+        if cached is not None:
+            return cached
+        result = await get_pipeline().ainvoke(
+            _with_request(patient_data, cancel_token, adapter, deadline))
+        return await _aassessment(result, key)
+
+
+# AyurGenix dataset columns → patient fields, so DataFrames can be passed as-is
+DATASET_COLUMNS = {
+    "Disease":             "disease",
+    "Symptoms":            "symptoms",
+    "Age Group":           "age_group",
+    "Gender":              "gender",
+    "Medical History":     "medical_history",
+    "Current Medications": "current_medications",
+    "Stress Levels":       "stress_levels",
+    "Dietary Habits":      "dietary_habits",
+}
+PATIENT_FIELDS = tuple(DATASET_COLUMNS.values())
+
+
+def _patient_records(patients) -> list:
+    """Patient field dicts from a list of dicts or a DataFrame."""
+    if hasattr(patients, "to_dict"):
+        patients = patients.rename(columns=DATASET_COLUMNS).to_dict("records")
+    # Missing and NaN fields fall back to build_patient_data's defaults
+    return [{k: v for k, v in p.items() if k in PATIENT_FIELDS and v == v}
+            for p in patients]
+
+
+def guidance_prompts(patients) -> list:
+    """
+    GuidanceAgent prompts for many patients (list of dicts, or a DataFrame
+    with patient-field or AyurGenix column names), built by the rule agents
+    as the pipeline builds them. For benchmarks that drive generation directly.
+    """
+    states = [AssessmentState(**build_patient_data(**record))
+              for record in _patient_records(patients)]
+    for agent in (SymptomAgent(), DoshaAgent()):
+        for state, changes in zip(states, agent.updates_batch(states)):
+            state.update(changes)
+    return [build_prompt(state) for state in states]
+
+
+def run_ayurveda_pipeline_batch(patients, adapter=None, batch_size=None) -> list:
+    """
+    run_ayurveda_pipeline for many patients (list of dicts, or a DataFrame
+    with patient-field or AyurGenix column names). Each agent runs once over
+    all uncached patients: the rule agents in one pass, GuidanceAgent in
+    batched generate calls, SafetyAgent in bulk. Assessments come back in
+    input order.
+    """
+    states = [build_patient_data(**record) for record in _patient_records(patients)]
+    assessments, keys, todo = [None] * len(states), [None] * len(states), []
+    with tracing.span("pipeline.batch", patients=len(states), adapter=adapter):
+        for i, state in enumerate(states):
+            keys[i], assessments[i] = _lookup(state, adapter)
+            if assessments[i] is None:
+                todo.append(_with_request(state, None, adapter))
+        steps = [
+            ("symptom",  SymptomAgent().updates_batch),
+            ("dosha",    DoshaAgent().updates_batch),
+            ("guidance", lambda states: GuidanceAgent().updates_batch(
+                states, batch_size or PIPELINE_BATCH_SIZE)),
+            ("safety",   SafetyAgent().updates_batch),
+        ]
+        if todo:
+            for name, updates_batch in steps:
+                with tracing.span(f"node.{name}"):
+                    for state, changes in zip(todo, updates_batch(todo)):
+                        state.update(changes)
+        results = iter(todo)
+        for i in range(len(states)):
+            if assessments[i] is None:
+                assessments[i] = _assessment(next(results), keys[i])
+    return assessments
+
+
+def _tongue_state(image, disease, symptoms, cancel_token, adapter, deadline,
+                  patient_fields: dict) -> AssessmentState:
+    patient_data = build_patient_data(disease, symptoms, **patient_fields)
+    return _with_request(patient_data, cancel_token, adapter,
+                         deadline).update(tongue_image=image)
+
+
+def run_tongue_pipeline(image, disease, symptoms, cancel_token=None,
+                        adapter=None, deadline=None, **patient_fields) -> str:
+    """Multimodal entry point — tongue image + symptoms, 5-agent pipeline."""
+    patient_data = _tongue_state(image, disease, symptoms, cancel_token, adapter,
+                                 deadline, patient_fields)
+    with tracing.span("pipeline.tongue", adapter=adapter):
+        result = get_tongue_pipeline().invoke(patient_data)
+    return _assessment(result, None)
+
+
+async def arun_tongue_pipeline(image, disease, symptoms, cancel_token=None,
+                               adapter=None, deadline=None, **patient_fields) -> str:
+    """Awaitable run_tongue_pipeline; VisionAgent and GuidanceAgent use the executor."""
+    patient_data = _tongue_state(image, disease, symptoms, cancel_token, adapter,
+                                 deadline, patient_fields)
+    with tracing.span("pipeline.tongue", adapter=adapter):
+        result = await get_tongue_pipeline().ainvoke(patient_data)
+    return _assessment(result, None)
+
+
+# ── Streaming ────────────────────────────────────────────────────────────────
+# The streaming path splits the pipeline at GuidanceAgent: the rule agents run
+# up front so their analysis can be sent immediately, then MedGemma tokens are
+# passed through SafetyAgent's incremental filter as they are decoded.
+
+def prepare_assessment(cancel_token=None, adapter=None, deadline=None,
+                       **patient_fields) -> tuple:
+    """
+    Runs SymptomAgent → DoshaAgent only (cheap, no model call). Returns
+    (state, cached assessment or None); on a miss stream_guidance stores its
+    result under the same key run_ayurveda_pipeline uses. Past `deadline`
+    stream_guidance skips the model, as run_ayurveda_pipeline does.
+    """
+    patient_data = build_patient_data(**patient_fields)
+    key, cached  = _lookup(patient_data, adapter)
+    state = _with_request(patient_data, cancel_token, adapter,
+                          deadline).update(cache_key=key)
+    state.update(Node("symptom", SymptomAgent().updates).run(state))
+    return state.update(Node("dosha", DoshaAgent().updates).run(state)), cached
+
+
+def stream_guidance(state: AssessmentState, on_text) -> str:
+    """
+    Runs GuidanceAgent → SafetyAgent on a prepared state, calling `on_text`
+    with safety-filtered text as it is generated (disclaimer last).
+    Returns the full assessment, identical in shape to run_ayurveda_pipeline.
+    """
+    safety_filter = SafetyAgent().stream_filter()
+
+    def on_fragment(text):
+        safe = safety_filter.feed(text)
+        if safe:
+            on_text(safe)
+
+    guidance = Node("guidance", lambda s: GuidanceAgent().stream(s, on_fragment))
+    state.update(guidance.run(state))
+    on_text(safety_filter.flush())
+
+    state.update(Node("safety", SafetyAgent().updates).run(state))
+    return _assessment(state, state.cache_key)
@@ -0,0 +1,91 @@
+"""
+Typed, slotted state passed between pipeline nodes.
+
+Agents used to return `{**state, ...}`, rebuilding the whole mapping (patient
+fields, tongue image, treatment dict, model output) at every hop. Now each
+agent computes only the fields it changes (`updates()`), and the pipeline
+applies them to one AssessmentState:
+
+  SequentialPipeline → in place, so a request owns a single state object
+  LangGraph          → StateGraph(AssessmentState) keeps one channel per
+                       field, so node updates touch only their own fields
+
+A field set to None counts as absent, which keeps the dict-style access the
+agents use (`state.get(k, default)`, `k in state`, `{**state}`) working on
+both AssessmentState and plain dicts.
+"""
+from dataclasses import dataclass, fields
+from typing import Any
+
+
+@dataclass(slots=True, eq=False)
+class AssessmentState:
+    # Patient input
+    disease:             Any = None
+    symptoms:            Any = None
+    age_group:           Any = None
+    gender:              Any = None
+    medical_history:     Any = None
+    current_medications: Any = None
+    stress_levels:       Any = None
+    dietary_habits:      Any = None
+    tongue_image:        Any = None
+    # Request-scoped (never part of the cache key)
+    cancel_token:        Any = None
+    adapter:             Any = None
+    deadline:            Any = None
+    cache_key:           Any = None   # streaming path: where to store the result
+    # SymptomAgent
+    dosha_scores:        Any = None
+    primary_dosha:       Any = None
+    secondary_dosha:     Any = None
+    symptom_analysis:    Any = None
+    # VisionAgent
+    tongue_analysis:        Any = None
+    visual_dosha_indicator: Any = None
+    dosha_scores_vision:    Any = None
+    # DoshaAgent
+    dosha_treatment:     Any = None
+    constitution:        Any = None
+    # GuidanceAgent
+    model_output:        Any = None
+    generation_stats:    Any = None
+    degraded:            Any = None
+    # SafetyAgent
+    final_output:        Any = None
+
+    @classmethod
+    def from_dict(cls, data) -> "AssessmentState":
+        """Wrap a plain dict (one shallow copy); states pass through as-is."""
+        return data if isinstance(data, cls) else cls(**data)
+
+    def update(self, changes: dict = None, **kwargs) -> "AssessmentState":
+        """Apply a node's updates in place; unknown fields raise AttributeError."""
+        for key, value in {**(changes or {}), **kwargs}.items():
+            setattr(self, key, value)
+        return self
+
+    def get(self, key: str, default=None):
+        value = getattr(self, key, None)
+        return default if value is None else value
+
+    def __getitem__(self, key: str):
+        value = getattr(self, key, None)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key) -> bool:
+        return getattr(self, key, None) is not None
+
+    def keys(self) -> list:
+        return [name for name in FIELDS if getattr(self, name) is not None]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.keys()}
+
+
+FIELDS = tuple(f.name for f in fields(AssessmentState))
@@ -1,11 +1,14 @@
 import torch
-from graph.pipeline import run_ayurveda_pipeline
+from graph.pipeline import (run_ayurveda_pipeline, run_tongue_pipeline,
+                            arun_ayurveda_pipeline, arun_tongue_pipeline,
+                            run_ayurveda_pipeline_batch)
 
 def get_ayurvedic_assessment(disease, symptoms, age_group="Adult (20-40)",
                               gender="Male", medical_history="None",
                               current_medications="None",
                               stress_levels="Moderate",
-                              dietary_habits="Not specified") -> str:
+                              dietary_habits="Not specified",
+                              cancel_token=None, adapter=None, deadline=None) -> str:
     """
     Public API — routes through full 4-agent LangGraph pipeline:
       SymptomAgent → DoshaAgent → GuidanceAgent (MedGemma) → SafetyAgent
@@ -16,10 +19,60 @@ def get_ayurvedic_assessment(disease, symptoms, age_group="Adult (20-40)",
         medical_history=medical_history,
         current_medications=current_medications,
         stress_levels=stress_levels,
+        dietary_habits=dietary_habits,
+        cancel_token=cancel_token,
+        adapter=adapter,
+        deadline=deadline
+    )
+
+
+def get_tongue_assessment(image, disease, symptoms, age_group="Adult (20-40)",
+                          gender="Male", medical_history="None",
+                          current_medications="None",
+                          stress_levels="Moderate",
+                          dietary_habits="Not specified",
+                          cancel_token=None, adapter=None, deadline=None) -> str:
+    """
+    Multimodal API — VisionAgent reads the tongue image in parallel with
+    SymptomAgent, then DoshaAgent → GuidanceAgent → SafetyAgent as usual.
+    """
+    return run_tongue_pipeline(
+        image, disease=disease, symptoms=symptoms,
+        cancel_token=cancel_token, adapter=adapter, deadline=deadline,
+        age_group=age_group, gender=gender,
+        medical_history=medical_history,
+        current_medications=current_medications,
+        stress_levels=stress_levels,
         dietary_habits=dietary_habits
     )
 
 
+def get_ayurvedic_assessments(patients, adapter=None, batch_size=None) -> list:
+    """
+    Batch API — many patients (list of dicts or a DataFrame) through the
+    same pipeline with batched generation; results are in input order.
+    """
+    return run_ayurveda_pipeline_batch(patients, adapter=adapter,
+                                       batch_size=batch_size)
+
+async def aget_ayurvedic_assessment(disease, symptoms, cancel_token=None,
+                                    adapter=None, deadline=None,
+                                    **patient_fields) -> str:
+    """Awaitable get_ayurvedic_assessment for async callers (FastAPI)."""
+    return await arun_ayurveda_pipeline(disease=disease, symptoms=symptoms,
+                                        cancel_token=cancel_token, adapter=adapter,
+                                        deadline=deadline, **patient_fields)
+
+
+async def aget_tongue_assessment(image, disease, symptoms, cancel_token=None,
+                                 adapter=None, deadline=None,
+                                 **patient_fields) -> str:
+    """Awaitable get_tongue_assessment for async callers (FastAPI)."""
+    return await arun_tongue_pipeline(image, disease=disease, symptoms=symptoms,
+                                      cancel_token=cancel_token, adapter=adapter,
+                                      deadline=deadline, **patient_fields)
+
+
 if __name__ == "__main__":
     print("=" * 60)
     print("TEST 1: Diabetes — Full Agent Pipeline")
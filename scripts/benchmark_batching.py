@@ -0,0 +1,38 @@
+"""
+Throughput of GuidanceAgent generation vs. batch size.
+
+Builds real GuidanceAgent prompts from the AyurGenix dataset and times
+`generate_batch` at several batch sizes. Usage:
+
+    python scripts/benchmark_batching.py --batch-sizes 1 2 4 8 --num-prompts 16
+"""
+import sys, os, time, argparse
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from agents.guidance_agent import generate_batch
+from graph.pipeline import guidance_prompts
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8])
+parser.add_argument("--num-prompts", type=int, default=16)
+parser.add_argument("--max-new-tokens", type=int, default=128)
+args = parser.parse_args()
+
+df = pd.read_csv("dataset/kaggle_ayurveda/AyurGenixAI_Dataset.csv").fillna("Not specified")
+prompts = guidance_prompts(df.head(args.num_prompts))
+
+print("Warming up...")
+generate_batch(prompts[:1], max_new_tokens=8)
+
+print(f"\n{'batch':>5} | {'seconds':>8} | {'req/s':>6} | {'tok/s':>7}")
+print("-" * 36)
+for bs in args.batch_sizes:
+    start  = time.perf_counter()
+    tokens = 0
+    for i in range(0, len(prompts), bs):
+        results = generate_batch(prompts[i:i + bs], max_new_tokens=args.max_new_tokens)
+        tokens += sum(r["generated_tokens"] for r in results)
+    elapsed = time.perf_counter() - start
+    print(f"{bs:>5} | {elapsed:>8.2f} | {len(prompts) / elapsed:>6.2f} | "
+          f"{tokens / elapsed:>7.1f}")
@@ -0,0 +1,124 @@
+"""
+Continuous batching vs. one request per `generate` call.
+
+Replays the same open-loop workload against both: requests arrive at
+--rate per second (Poisson), each with its own token budget drawn from
+--min-tokens..--max-tokens, so short and long generations mix. Reports
+throughput and per-request latency (arrival → last token).
+
+    # GuidanceAgent's MedGemma model and AyurGenix prompts
+    python scripts/benchmark_continuous.py --num-requests 16 --rate 1
+
+    # any small causal LM on CPU, e.g. for a quick check without a GPU
+    python scripts/benchmark_continuous.py --model sshleifer/tiny-gpt2 --rate 20
+"""
+import sys, os, time, queue, random, argparse, threading, statistics
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+import torch
+from serving.continuous import ContinuousBatchingEngine, eos_token_ids
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--model", help="HF causal LM id/path (default: GuidanceAgent model)")
+parser.add_argument("--num-requests", type=int, default=16)
+parser.add_argument("--rate", type=float, default=1.0, help="arrivals per second")
+parser.add_argument("--min-tokens", type=int, default=32)
+parser.add_argument("--max-tokens", type=int, default=512)
+parser.add_argument("--max-batch", type=int, default=8)
+parser.add_argument("--seed", type=int, default=0)
+args = parser.parse_args()
+
+df = pd.read_csv("dataset/kaggle_ayurveda/AyurGenixAI_Dataset.csv").fillna("Not specified")
+rows = df.head(args.num_requests)
+
+if args.model:
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+    model = AutoModelForCausalLM.from_pretrained(args.model, dtype=torch.float32).eval()
+    texts = [f"Patient with {r['Disease']}: {r['Symptoms']}. Ayurvedic assessment:"
+             for _, r in rows.iterrows()]
+else:
+    from agents.guidance_agent import _load_model
+    from graph.pipeline import guidance_prompts
+    model, tokenizer = _load_model()
+    texts = guidance_prompts(rows)
+
+rng = random.Random(args.seed)
+workload, at = [], 0.0
+for text in texts:
+    at += rng.expovariate(args.rate)
+    workload.append((at, tokenizer(text)["input_ids"],
+                     rng.randint(args.min_tokens, args.max_tokens)))
+eos = eos_token_ids(model, tokenizer)
+
+
+def replay(submit) -> dict:
+    """Feed the workload in real time; `submit(ids, budget, done)` must call done(tokens)."""
+    latencies, tokens, lock = [], [], threading.Lock()
+    finished = threading.Semaphore(0)
+    start = time.perf_counter()
+
+    def done_at(arrival):
+        def done(generated):
+            with lock:
+                latencies.append(time.perf_counter() - start - arrival)
+                tokens.append(len(generated))
+            finished.release()
+        return done
+
+    for arrival, ids, budget in workload:
+        time.sleep(max(0.0, arrival - (time.perf_counter() - start)))
+        submit(ids, budget, done_at(arrival))
+    for _ in workload:
+        finished.acquire()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {"tok_s": sum(tokens) / elapsed,
+            "p50":   statistics.median(latencies),
+            "p95":   latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))],
+            "mean":  statistics.mean(latencies)}
+
+
+def run_sequential() -> dict:
+    """Current behaviour: one `generate` call per request, FIFO."""
+    jobs = queue.Queue()
+
+    def worker():
+        while True:
+            ids, budget, done = jobs.get()
+            with torch.inference_mode():
+                out = model.generate(torch.tensor([ids], device=model.device),
+                                     max_new_tokens=budget, do_sample=False,
+                                     eos_token_id=list(eos),
+                                     pad_token_id=tokenizer.eos_token_id)
+            done(out[0, len(ids):].tolist())
+
+    threading.Thread(target=worker, daemon=True).start()
+    return replay(lambda ids, budget, done: jobs.put((ids, budget, done)))
+
+
+def run_continuous() -> dict:
+    engine = ContinuousBatchingEngine(model, eos, max_batch_size=args.max_batch,
+                                      name="benchmark-continuous")
+
+    def submit(ids, budget, done):
+        engine.submit(ids, budget).add_done_callback(lambda f: done(f.result()))
+    return replay(submit)
+
+
+print("Warming up...")
+with torch.inference_mode():
+    model.generate(torch.tensor([workload[0][1]], device=model.device),
+                   max_new_tokens=4, do_sample=False, pad_token_id=tokenizer.eos_token_id)
+
+results = {}
+for name, run in (("generate", run_sequential), ("continuous", run_continuous)):
+    print(f"Running {name}...")
+    results[name] = run()
+
+print(f"\n{'mode':>10} | {'tok/s':>7} | {'p50 s':>7} | {'p95 s':>7} | {'mean s':>7}")
+print("-" * 50)
+for name, r in results.items():
+    print(f"{name:>10} | {r['tok_s']:>7.1f} | {r['p50']:>7.2f} | "
+          f"{r['p95']:>7.2f} | {r['mean']:>7.2f}")
@@ -0,0 +1,69 @@
+"""
+Load time and per-token latency of the adapter vs. merged serving modes.
+
+Each mode runs in a fresh subprocess (AYURVEDA_SERVING_MODE set accordingly)
+so load times are cold and the two models never share a GPU. Build the
+merged checkpoint first with scripts/merge_lora.py. Usage:
+
+    python scripts/benchmark_merged.py --num-prompts 8 --max-new-tokens 128
+"""
+import sys, os, json, time, argparse, subprocess, statistics
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--modes", nargs="+", default=["adapter", "merged"])
+parser.add_argument("--num-prompts", type=int, default=8)
+parser.add_argument("--max-new-tokens", type=int, default=128)
+parser.add_argument("--worker", help=argparse.SUPPRESS)
+args = parser.parse_args()
+
+
+def measure() -> dict:
+    import pandas as pd
+    from agents.guidance_agent import generate_batch, _load_model
+    from graph.pipeline import guidance_prompts
+    from serving.models import get_registry
+
+    start = time.perf_counter()
+    _load_model()
+    load_seconds = time.perf_counter() - start
+
+    df = pd.read_csv("dataset/kaggle_ayurveda/AyurGenixAI_Dataset.csv").fillna("Not specified")
+    prompts = guidance_prompts(df.head(args.num_prompts))
+
+    generate_batch(prompts[:1], max_new_tokens=8)   # warm-up
+    ttft, ms_per_token = [], []
+    for prompt in prompts:
+        result = generate_batch([prompt], max_new_tokens=args.max_new_tokens)[0]
+        ttft.append(result["ttft_seconds"] * 1000)
+        if result["decode_tokens_per_second"]:
+            ms_per_token.append(1000 / result["decode_tokens_per_second"])
+
+    return {
+        "load_seconds":    load_seconds,
+        "ttft_ms":         statistics.median(ttft),
+        "ms_per_token":    statistics.median(ms_per_token) if ms_per_token else 0.0,
+        "registry":        get_registry().report(),
+    }
+
+
+if args.worker:
+    print(json.dumps(measure()))
+    sys.exit(0)
+
+results = {}
+for mode in args.modes:
+    print(f"Benchmarking {mode} mode...")
+    proc = subprocess.run(
+        [sys.executable, __file__, "--worker", mode,
+         "--num-prompts", str(args.num_prompts),
+         "--max-new-tokens", str(args.max_new_tokens)],
+        env={**os.environ, "AYURVEDA_SERVING_MODE": mode},
+        capture_output=True, text=True, check=True)
+    results[mode] = json.loads(proc.stdout.strip().splitlines()[-1])
+
+print(f"\n{'mode':>8} | {'load s':>7} | {'TTFT ms':>8} | {'ms/token':>8}")
+print("-" * 41)
+for mode, r in results.items():
+    print(f"{mode:>8} | {r['load_seconds']:>7.1f} | {r['ttft_ms']:>8.1f} | "
+          f"{r['ms_per_token']:>8.2f}")
@@ -0,0 +1,99 @@
+"""
+Speculative decoding vs. plain greedy GuidanceAgent generation.
+
+Decodes AyurGenix prompts one at a time with each speculative mode and
+reports decode throughput, how many tokens each target-model forward pass
+yields, the draft acceptance rate and whether the text still matches
+greedy exactly. Usage:
+
+    python scripts/benchmark_speculative.py --modes off prompt_lookup draft
+
+Acceptance rate (draft mode) = accepted draft tokens / drafted tokens, where
+every draft forward proposes one token and every target forward emits one
+token of its own on top of the accepted ones.
+"""
+import sys, os, time, argparse
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from agents.guidance_agent import generate_batch, _load_model
+from graph.pipeline import guidance_prompts
+from serving.models import get_registry
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--modes", nargs="+", default=["off", "prompt_lookup", "draft"])
+parser.add_argument("--num-prompts", type=int, default=10)
+parser.add_argument("--max-new-tokens", type=int, default=512)
+args = parser.parse_args()
+
+
+class ForwardCounter:
+    """Counts forward calls of a module while active."""
+
+    def __init__(self, module):
+        self.module = module
+        self.calls  = 0
+
+    def __enter__(self):
+        self._handle = self.module.register_forward_hook(self._hook)
+        return self
+
+    def _hook(self, *_):
+        self.calls += 1
+
+    def __exit__(self, *exc):
+        self._handle.remove()
+
+
+df = pd.read_csv("dataset/kaggle_ayurveda/AyurGenixAI_Dataset.csv").fillna("Not specified")
+# Same held-out cases as scripts/evaluate.py
+prompts = guidance_prompts(df.tail(args.num_prompts))
+
+model, _ = _load_model()
+target = model.get_base_model() if hasattr(model, "get_base_model") else model
+
+greedy, summary = None, []
+for mode in args.modes:
+    generate_batch(prompts[:1], max_new_tokens=8, speculative=mode)   # warm-up
+    draft = get_registry().draft_model()[0] if mode == "draft" else None
+
+    texts, tokens, target_calls, draft_calls = [], 0, 0, 0
+    start = time.perf_counter()
+    for prompt in prompts:
+        with ForwardCounter(target) as t:
+            if draft is not None:
+                with ForwardCounter(draft) as d:
+                    result = generate_batch([prompt], args.max_new_tokens,
+                                            speculative=mode)[0]
+                draft_calls += d.calls
+            else:
+                result = generate_batch([prompt], args.max_new_tokens,
+                                        speculative=mode)[0]
+        target_calls += t.calls
+        tokens += result["generated_tokens"]
+        texts.append(result["text"])
+    elapsed = time.perf_counter() - start
+
+    if greedy is None and mode == "off":
+        greedy = texts
+    accepted = tokens - target_calls
+    summary.append({
+        "mode":       mode,
+        "tok_s":      tokens / elapsed,
+        "per_step":   tokens / target_calls if target_calls else 0.0,
+        "acceptance": accepted / draft_calls if draft_calls else None,
+        "identical":  (sum(a == b for a, b in zip(texts, greedy))
+                       if greedy is not None else None),
+    })
+
+base = next((s["tok_s"] for s in summary if s["mode"] == "off"), None)
+print(f"\n{'mode':>14} | {'tok/s':>7} | {'speedup':>7} | {'tok/step':>8} | "
+      f"{'accept':>6} | {'= greedy':>8}")
+print("-" * 66)
+for s in summary:
+    speedup    = f"{s['tok_s'] / base:.2f}x" if base else "n/a"
+    acceptance = f"{s['acceptance']:.0%}" if s["acceptance"] is not None else "n/a"
+    identical  = (f"{s['identical']}/{len(prompts)}"
+                  if s["identical"] is not None else "n/a")
+    print(f"{s['mode']:>14} | {s['tok_s']:>7.1f} | {speedup:>7} | "
+          f"{s['per_step']:>8.2f} | {acceptance:>6} | {identical:>8}")
@@ -0,0 +1,82 @@
+"""
+Pipeline state overhead: dict splatting vs. in-place AssessmentState.
+
+Runs the rule agents plus a fixed GuidanceAgent output (no model is loaded)
+over AyurGenix rows, once the old way (`{**state, ...}` at every node) and
+once through the pipeline's way (`updates()` applied to one AssessmentState).
+Reports time per request and the memory held per in-flight request, with a
+tongue image in the state as on /api/tongue. Usage:
+
+    python scripts/benchmark_state.py --num-prompts 200 --repeat 20
+"""
+import sys, os, time, argparse, tracemalloc
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from PIL import Image
+from agents import SymptomAgent, DoshaAgent, SafetyAgent
+from graph.pipeline import build_patient_data, DATASET_COLUMNS
+from graph.state import AssessmentState
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--num-prompts", type=int, default=200)
+parser.add_argument("--repeat", type=int, default=20)
+parser.add_argument("--image-size", type=int, default=448)
+args = parser.parse_args()
+
+df = pd.read_csv("dataset/kaggle_ayurveda/AyurGenixAI_Dataset.csv").fillna("Not specified")
+patients = [build_patient_data(**{DATASET_COLUMNS[c]: row[c] for c in DATASET_COLUMNS})
+            for _, row in df.head(args.num_prompts).iterrows()]
+image = Image.new("RGB", (args.image_size, args.image_size))
+
+symptom_agent, dosha_agent, safety_agent = SymptomAgent(), DoshaAgent(), SafetyAgent()
+GUIDANCE = {"model_output": "Follow a warm, grounding routine. " * 40,
+            "generation_stats": {"new_tokens": 400, "adapter": "default"}}
+
+
+def splatted(patient: dict):
+    state = {**patient, "tongue_image": image, "cancel_token": None, "adapter": None}
+    state = symptom_agent.run(state)
+    state = dosha_agent.run(state)
+    state = {**state, **GUIDANCE}
+    return safety_agent.run(state)
+
+
+def in_place(patient: dict):
+    state = AssessmentState(**patient, tongue_image=image)
+    state.update(symptom_agent.updates(state))
+    state.update(dosha_agent.updates(state))
+    state.update(GUIDANCE)
+    return state.update(safety_agent.updates(state))
+
+
+def per_request_us(fn) -> float:
+    best = float("inf")
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        for patient in patients:
+            fn(patient)
+        best = min(best, time.perf_counter() - start)
+    return best / len(patients) * 1e6
+
+
+def held_bytes(fn) -> float:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    in_flight = [fn(patient) for patient in patients]
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del in_flight
+    return held / len(patients)
+
+
+print(f"{len(patients)} requests, best of {args.repeat}\n")
+print(f"{'state':>10}  {'µs/request':>11}  {'bytes held/request':>19}")
+results = {}
+for name, fn in (("dict", splatted), ("in-place", in_place)):
+    results[name] = (per_request_us(fn), held_bytes(fn))
+    print(f"{name:>10}  {results[name][0]:>11.1f}  {results[name][1]:>19.0f}")
+
+(dict_us, dict_bytes), (state_us, state_bytes) = results["dict"], results["in-place"]
+print(f"\nin-place: {dict_us / state_us:.2f}x faster, "
+      f"{(1 - state_bytes / dict_bytes) * 100:.0f}% less memory per request")
@@ -1,9 +1,53 @@
-import sys, os
+"""
+Herb accuracy of GuidanceAgent on held-out AyurGenix cases.
+
+    python scripts/evaluate.py
+    python scripts/evaluate.py --compare cpu:float32:none cpu:bfloat16:none \
+                                         cpu:float32:dynamic_int8
+
+--compare runs the evaluation once per DEVICE:DTYPE:QUANTIZE backend, each in
+a fresh subprocess with the assessment cache off, and prints accuracy next to
+seconds per case and the speedup over the first backend.
+
+All cases go through get_ayurvedic_assessments in one call; --batch-size sets
+how many share each generate call (1 reproduces one-at-a-time timing).
+"""
+import sys, os, json, time, argparse, subprocess
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--compare", nargs="+", metavar="DEVICE:DTYPE:QUANTIZE")
+parser.add_argument("--batch-size", type=int, default=8,
+                    help="GuidanceAgent rows per generate call")
+parser.add_argument("--json", action="store_true", help=argparse.SUPPRESS)
+args = parser.parse_args()
+
+if args.compare:
+    rows = []
+    for spec in args.compare:
+        device, dtype, quantize = spec.split(":")
+        print(f"Evaluating {spec}...")
+        proc = subprocess.run(
+            [sys.executable, __file__, "--json", "--batch-size", str(args.batch_size)],
+            env={**os.environ, "AYURVEDA_CACHE": "0", "AYURVEDA_DEVICE": device,
+                 "AYURVEDA_CPU_DTYPE": dtype, "AYURVEDA_QUANTIZE": quantize},
+            capture_output=True, text=True, check=True)
+        rows.append((spec, json.loads(proc.stdout.strip().splitlines()[-1])))
+
+    baseline = rows[0][1]["seconds_per_case"]
+    print(f"\n{'backend':<28} | {'herb acc':>8} | {'specific':>8} | {'s/case':>7} | {'speedup':>7}")
+    print("-" * 72)
+    for spec, r in rows:
+        print(f"{spec:<28} | {r['herb_accuracy']:>8.0%} | {r['specific_accuracy']:>8.0%} | "
+              f"{r['seconds_per_case']:>7.1f} | {baseline / r['seconds_per_case']:>6.2f}x")
+    sys.exit(0)
+
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import pandas as pd
-from inference import get_ayurvedic_assessment
+from inference import get_ayurvedic_assessments
+from serving.models import get_registry
 
+get_registry().text_model()   # keep model load out of the per-case timing
 print("Running evaluation on held-out test cases...")
 
 df = pd.read_csv("dataset/kaggle_ayurveda/AyurGenixAI_Dataset.csv")
@@ -12,18 +56,11 @@ df = df.fillna("Not specified")
 test_cases = df.tail(10)
 results = []
 
-for _, row in test_cases.iterrows():
-    prediction = get_ayurvedic_assessment(
-        disease=row["Disease"],
-        symptoms=row["Symptoms"],
-        age_group=row["Age Group"],
-        gender=row["Gender"],
-        medical_history=row["Medical History"],
-        current_medications=row["Current Medications"],
-        stress_levels=row["Stress Levels"],
-        dietary_habits=row["Dietary Habits"]
-    )
+start = time.perf_counter()
+predictions = get_ayurvedic_assessments(test_cases, batch_size=args.batch_size)
+elapsed = time.perf_counter() - start
 
+for (_, row), prediction in zip(test_cases.iterrows(), predictions):
     expected_herbs = str(row["Ayurvedic Herbs"]).strip().lower()
     predicted_lower = prediction.lower()
 
@@ -54,7 +91,13 @@ avg = sum(r["herb_accuracy"] for r in results) / len(results)
 specific = [r for r in results if r["found"] != "N/A"]
 specific_avg = sum(r["herb_accuracy"] for r in specific) / len(specific) if specific else 0
 
+if args.json:
+    print(json.dumps({"herb_accuracy": avg, "specific_accuracy": specific_avg,
+                      "seconds_per_case": elapsed / len(results)}))
+    sys.exit(0)
+
 print(f"\nOverall herb accuracy     : {avg:.0%}")
 print(f"Specific herb accuracy    : {specific_avg:.0%} ({len(specific)} diseases with named herbs)")
 print(f"Total test cases          : {len(results)}")
+print(f"Seconds per case          : {elapsed / len(results):.1f}")
 print("\nSave these numbers for your writeup!")
@@ -0,0 +1,72 @@
+"""
+Fold the Ayurveda LoRA adapter into the MedGemma base weights.
+
+Writes a standalone checkpoint (sharded safetensors + processor files, with
+the adapter's tokenizer and chat template when it ships them) that
+the server loads with AYURVEDA_SERVING_MODE=merged, so generation no longer
+pays for the per-layer LoRA matmuls. Usage:
+
+    python scripts/merge_lora.py --output models/medgemma-ayurveda-merged
+
+The merge is done in float32 by default and cast to the serving dtype only
+when saving, which avoids compounding bf16 rounding in W + BA. The base model
+is resolved like the server resolves it (AYURVEDA_MODEL_DIR, the hub cache,
+AYURVEDA_OFFLINE, the manifest), so merging works air-gapped.
+"""
+import sys, os, json, time, argparse
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch
+from transformers import AutoProcessor, AutoTokenizer, AutoModelForImageTextToText
+from peft import PeftModel
+from serving.models import (BASE_MODEL, LORA_PATH, MERGED_PATH, MODEL_DTYPE,
+                            ADAPTER_FILES, MERGE_INFO_FILE, _hash_files)
+from serving.resolver import ModelResolver
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--base-model", default=BASE_MODEL)
+parser.add_argument("--adapter", default=LORA_PATH)
+parser.add_argument("--output", default=MERGED_PATH)
+parser.add_argument("--max-shard-size", default="2GB")
+parser.add_argument("--merge-dtype", choices=["float32", "bfloat16"], default="float32")
+args = parser.parse_args()
+
+start = time.perf_counter()
+# Same local directory / hub cache, offline rules and manifest as the server
+resolver = ModelResolver()
+base_dir = resolver.resolve(args.base_model, "base")
+resolver.adapter(args.adapter, "adapter")
+adapter_hash = _hash_files(args.adapter, ADAPTER_FILES)
+
+print(f"[1/4] Loading {args.base_model} from {base_dir} ({args.merge_dtype}, CPU)...")
+base = AutoModelForImageTextToText.from_pretrained(
+    base_dir, dtype=getattr(torch, args.merge_dtype), **resolver.hub_kwargs())
+
+print(f"[2/4] Merging adapter {args.adapter}...")
+model = PeftModel.from_pretrained(base, args.adapter)
+model = model.merge_and_unload()
+model = model.to(MODEL_DTYPE)
+
+print(f"[3/4] Saving to {args.output} (shards <= {args.max_shard_size})...")
+os.makedirs(args.output, exist_ok=True)
+model.save_pretrained(args.output, safe_serialization=True,
+                      max_shard_size=args.max_shard_size)
+# The fine-tune's tokenizer and chat template, as the adapter mode serves them
+tokenizer = AutoTokenizer.from_pretrained(
+    resolver.tokenizer_source(args.adapter, base_dir), **resolver.hub_kwargs())
+AutoProcessor.from_pretrained(base_dir, tokenizer=tokenizer,
+                              **resolver.hub_kwargs()).save_pretrained(args.output)
+
+print("[4/4] Writing merge info...")
+info = {
+    "base_model":   args.base_model,
+    "adapter_path": args.adapter,
+    "adapter_hash": adapter_hash,
+    "merge_dtype":  args.merge_dtype,
+    "dtype":        str(MODEL_DTYPE),
+}
+with open(os.path.join(args.output, MERGE_INFO_FILE), "w") as f:
+    json.dump(info, f, indent=2)
+
+print(f"Done in {time.perf_counter() - start:.1f}s. "
+      f"Serve with AYURVEDA_SERVING_MODE=merged AYURVEDA_MERGED_PATH={args.output}")
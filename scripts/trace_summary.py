@@ -0,0 +1,115 @@
+"""
+Summarise the trace store written by serving/tracing.py.
+
+Lists the slowest traces with where their time went (summed per span name),
+shows one trace as a tree, or converts traces to Chrome's trace-event format
+for chrome://tracing / Perfetto. Usage:
+
+    python scripts/trace_summary.py                      # 10 slowest traces
+    python scripts/trace_summary.py --top 20 --name "http POST /api/assess"
+    python scripts/trace_summary.py --trace 3f2a...      # one trace as a tree
+    python scripts/trace_summary.py --chrome trace.json  # open in Perfetto
+"""
+import sys, os, json, glob, argparse
+from collections import defaultdict
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from serving.tracing import TRACE_PATH
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--path", default=TRACE_PATH,
+                    help="trace file; rotated backups (.1, .2, ...) are read too")
+parser.add_argument("--top", type=int, default=10)
+parser.add_argument("--name", help="only traces whose root span has this name")
+parser.add_argument("--trace", help="print one trace id as a tree")
+parser.add_argument("--chrome", help="write the selected traces as Chrome trace events")
+args = parser.parse_args()
+
+
+def load_spans(path: str) -> dict:
+    traces = defaultdict(list)
+    for file in sorted(glob.glob(path + ".*"), reverse=True) + [path]:
+        if not os.path.exists(file):
+            continue
+        with open(file) as f:
+            for line in f:
+                try:
+                    span = json.loads(line)
+                except json.JSONDecodeError:
+                    continue   # line cut short by a crash or rotation
+                traces[span["trace_id"]].append(span)
+    return traces
+
+
+def root_of(spans: list) -> dict:
+    ids = {s["span_id"] for s in spans}
+    roots = [s for s in spans if s["parent_id"] not in ids]
+    return max(roots, key=lambda s: s["duration_ms"])
+
+
+def extent_ms(spans: list) -> float:
+    start = min(s["start"] for s in spans)
+    end   = max(s["start"] + s["duration_ms"] / 1000 for s in spans)
+    return (end - start) * 1000
+
+
+def print_tree(spans: list):
+    children = defaultdict(list)
+    ids = {s["span_id"] for s in spans}
+    for s in sorted(spans, key=lambda s: s["start"]):
+        children[s["parent_id"] if s["parent_id"] in ids else None].append(s)
+    t0 = min(s["start"] for s in spans)
+
+    def walk(parent, depth):
+        for s in children[parent]:
+            attrs = f"  {s['attrs']}" if s.get("attrs") else ""
+            print(f"{(s['start'] - t0) * 1000:>9.1f} ms  {s['duration_ms']:>9.1f} ms  "
+                  f"{'  ' * depth}{s['name']}{attrs}")
+            walk(s["span_id"], depth + 1)
+    walk(None, 0)
+
+
+def chrome_events(traces: dict) -> list:
+    events = []
+    for pid, (trace_id, spans) in enumerate(traces.items(), start=1):
+        events.append({"ph": "M", "name": "process_name", "pid": pid,
+                       "args": {"name": f"{root_of(spans)['name']} {trace_id[:8]}"}})
+        for s in spans:
+            events.append({"ph": "X", "name": s["name"], "pid": pid,
+                           "tid": s.get("thread", "main"),
+                           "ts": s["start"] * 1e6, "dur": s["duration_ms"] * 1000,
+                           "args": {"span_id": s["span_id"], **s.get("attrs", {})}})
+    return events
+
+
+traces = load_spans(args.path)
+if not traces:
+    sys.exit(f"No spans in {args.path}*")
+
+if args.trace:
+    if args.trace not in traces:
+        sys.exit(f"Trace {args.trace} not found")
+    print_tree(traces[args.trace])
+    selected = {args.trace: traces[args.trace]}
+else:
+    if args.name:
+        traces = {t: s for t, s in traces.items() if root_of(s)["name"] == args.name}
+    ranked = sorted(traces.items(), key=lambda kv: extent_ms(kv[1]), reverse=True)
+    selected = dict(ranked[:args.top])
+    print(f"{len(traces)} traces; {len(selected)} slowest:\n")
+    for trace_id, spans in selected.items():
+        per_name = defaultdict(float)
+        for s in spans:
+            per_name[s["name"]] += s["duration_ms"]
+        root = root_of(spans)
+        print(f"{trace_id}  {extent_ms(spans):>9.1f} ms  {root['name']}")
+        for name, ms in sorted(per_name.items(), key=lambda kv: -kv[1]):
+            if name != root["name"]:
+                print(f"    {ms:>9.1f} ms  {name}")
+        print()
+
+if args.chrome:
+    with open(args.chrome, "w") as f:
+        json.dump({"traceEvents": chrome_events(selected),
+                   "displayTimeUnit": "ms"}, f)
+    print(f"Wrote {len(selected)} traces to {args.chrome}")
@@ -0,0 +1,4 @@
+"""
+Serving infrastructure for Ayurveda AI: inference executor, batching,
+model loading and request bookkeeping shared by the API and the agents.
+"""
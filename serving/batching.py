@@ -0,0 +1,91 @@
+"""
+Dynamic micro-batching for model generation.
+
+Callers submit single items and get a Future back. A background thread
+collects items until either `max_batch_size` are waiting or `max_wait_ms` has
+passed since the first one arrived, then hands the whole list to `batch_fn`
+in one call and resolves each Future with its own slice of the result.
+`batch_fn` may return an exception instance in place of a single item's
+result to fail just that caller.
+"""
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+from serving import metrics
+
+BATCH_MAX_SIZE    = int(os.environ.get("AYURVEDA_BATCH_MAX_SIZE", "4"))
+BATCH_MAX_WAIT_MS = float(os.environ.get("AYURVEDA_BATCH_MAX_WAIT_MS", "25"))
+
+
+class MicroBatcher:
+    """Groups concurrent single-item calls into batched `batch_fn` calls."""
+
+    def __init__(self, batch_fn, max_batch_size: int = BATCH_MAX_SIZE,
+                 max_wait_ms: float = BATCH_MAX_WAIT_MS, name: str = "batcher"):
+        self.batch_fn       = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms    = max(0.0, max_wait_ms)
+        self.name           = name
+        self.batch_sizes    = Counter()
+        self._queue  = queue.Queue()
+        self._lock   = threading.Lock()
+        self._thread = None
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._loop, name=self.name, daemon=True)
+                self._thread.start()
+
+    def submit(self, item) -> Future:
+        """Queue one item; the Future resolves to its entry of the batch result."""
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((item, future))
+        return future
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            # Skip callers that gave up while waiting
+            batch = [(item, f) for item, f in batch
+                     if f.set_running_or_notify_cancel()]
+            if batch:
+                self._run(batch)
+
+    def _run(self, batch: list):
+        self.batch_sizes[len(batch)] += 1
+        metrics.BATCH_SIZE.observe(len(batch), batcher=self.name)
+        try:
+            results = self.batch_fn([item for item, _ in batch])
+        except BaseException as e:
+            for _, f in batch:
+                f.set_exception(e)
+            return
+        for (_, f), result in zip(batch, results):
+            if isinstance(result, BaseException):
+                f.set_exception(result)
+            else:
+                f.set_result(result)
@@ -0,0 +1,156 @@
+"""
+Content-addressed assessment cache.
+
+GuidanceAgent decodes greedily, so identical patient fields + adapter weights
++ generation config always produce the identical assessment. Results are kept
+in two tiers:
+
+  memory → bounded LRU (OrderedDict), per process
+  disk   → SQLite table that survives restarts, bounded by TTL and row count
+
+Lookups check memory first, then disk (promoting disk hits into memory).
+The tiers have separate locks and methods, so async callers can check
+memory inline and run the SQLite tier on a worker thread.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_ENABLED        = os.environ.get("AYURVEDA_CACHE", "1") == "1"
+CACHE_PATH           = os.environ.get("AYURVEDA_CACHE_PATH", "cache/assessments.sqlite")
+CACHE_MEMORY_ENTRIES = int(os.environ.get("AYURVEDA_CACHE_MEMORY_ENTRIES", "256"))
+CACHE_DISK_ENTRIES   = int(os.environ.get("AYURVEDA_CACHE_DISK_ENTRIES", "10000"))
+CACHE_TTL_SECONDS    = float(os.environ.get("AYURVEDA_CACHE_TTL", str(7 * 24 * 3600)))
+
+
+def make_key(*parts) -> str:
+    """Stable SHA-256 over JSON-serialisable key parts."""
+    blob = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class AssessmentCache:
+    """Two-tier (memory LRU + SQLite) cache of finished assessments."""
+
+    def __init__(self, path: str = CACHE_PATH,
+                 memory_entries: int = CACHE_MEMORY_ENTRIES,
+                 disk_entries: int = CACHE_DISK_ENTRIES,
+                 ttl_seconds: float = CACHE_TTL_SECONDS):
+        self.memory_entries = memory_entries
+        self.disk_entries   = disk_entries
+        self.ttl_seconds    = ttl_seconds
+        self._memory  = OrderedDict()   # key -> (expires_at, value)
+        self._lock    = threading.Lock()   # memory tier and counters
+        self._db_lock = threading.Lock()   # SQLite connection
+        self.counters = {"memory_hits": 0, "disk_hits": 0,
+                         "misses": 0, "evictions": 0}
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS assessments ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def get(self, key: str):
+        value = self.get_memory(key)
+        return value if value is not None else self.get_disk(key)
+
+    def get_memory(self, key: str):
+        """Memory tier only; a None here is not yet counted as a miss."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[0] > time.time():
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return entry[1]
+            return None
+
+    def get_disk(self, key: str):
+        """Disk tier, after a get_memory miss; blocks on SQLite."""
+        now = time.time()
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT value, expires_at FROM assessments WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[1] > now:
+                self._db.execute(
+                    "UPDATE assessments SET accessed_at = ? WHERE key = ?", (now, key))
+                self._db.commit()
+        with self._lock:
+            if row is not None and row[1] > now:
+                self._remember(key, row[1], row[0])
+                self.counters["disk_hits"] += 1
+                return row[0]
+            self.counters["misses"] += 1
+            return None
+
+    def put(self, key: str, value: str):
+        self.put_memory(key, value)
+        self.put_disk(key, value)
+
+    def put_memory(self, key: str, value: str):
+        with self._lock:
+            self._remember(key, time.time() + self.ttl_seconds, value)
+
+    def put_disk(self, key: str, value: str):
+        """Blocks on SQLite."""
+        now = time.time()
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO assessments VALUES (?, ?, ?, ?)",
+                (key, value, now + self.ttl_seconds, now))
+            evicted = self._evict_disk(now)
+            self._db.commit()
+        with self._lock:
+            self.counters["evictions"] += evicted
+
+    def _remember(self, key, expires_at, value):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def _evict_disk(self, now):
+        expired = self._db.execute(
+            "DELETE FROM assessments WHERE expires_at <= ?", (now,)).rowcount
+        overflow = self._db.execute(
+            "DELETE FROM assessments WHERE key IN ("
+            " SELECT key FROM assessments ORDER BY accessed_at DESC"
+            " LIMIT -1 OFFSET ?)", (self.disk_entries,)).rowcount
+        return expired + overflow
+
+    def stats(self) -> dict:
+        with self._db_lock:
+            disk_rows = self._db.execute(
+                "SELECT COUNT(*) FROM assessments").fetchone()[0]
+        with self._lock:
+            lookups = (self.counters["memory_hits"] + self.counters["disk_hits"]
+                       + self.counters["misses"])
+            hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+            return {
+                **self.counters,
+                "hit_rate":       round(hits / lookups, 3) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries":   disk_rows,
+            }
+
+
+# Singleton cache instance
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache() -> AssessmentCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AssessmentCache()
+    return _cache
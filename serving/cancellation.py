@@ -0,0 +1,31 @@
+"""
+Per-request cancellation.
+
+The API creates a CancellationToken per request and cancels it when the HTTP
+client goes away. The token travels in the pipeline state to GuidanceAgent /
+VisionAgent, where a stopping criterion checks it after every decoding step,
+so abandoned requests stop consuming the model within one token.
+"""
+import threading
+
+
+class GenerationCancelled(RuntimeError):
+    """Raised in place of a result when the request was cancelled."""
+
+
+class CancellationToken:
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason = None
+
+    def cancel(self, reason: str = "client disconnected"):
+        self.reason = reason
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise GenerationCancelled(self.reason)
@@ -0,0 +1,248 @@
+"""
+Iteration-level (continuous) batching for greedy generation.
+
+MicroBatcher hands `generate` a fixed batch and waits for its longest member,
+so a short assessment queued behind a long one idles until the whole batch
+is done. This engine instead runs its own decode loop, one token per step
+for every active sequence, and changes the batch between steps:
+
+  join  → a new request is prefilled on its own, its KV cache is left-padded
+          to the batch width and appended as a new row
+  leave → a finished row (EOS, token budget or a stopping criterion) is
+          resolved at once and its row is dropped from the cache; columns
+          that are padding in every remaining row are trimmed
+
+Each sequence thus owns one row ("slot") of the batched KV cache; padding is
+masked and position ids are tracked per row, so every sequence decodes
+exactly as it would alone. Each sequence may also name its PEFT adapter;
+every forward runs inside `forward_context(adapters)` (one per row), which
+yields the kwargs routing the rows, so sequences on different LoRA adapters
+share a batch. ModelRegistry.generating is such a context, and also keeps
+other threads off the shared model while the engine's forward runs.
+
+The engine is model-agnostic: anything accepting input_ids / attention_mask /
+position_ids / past_key_values works, including tiny CPU models for tests
+and benchmarks.
+"""
+import inspect
+import queue
+import threading
+from concurrent.futures import Future
+from contextlib import nullcontext
+
+import torch
+import torch.nn.functional as F
+from transformers import DynamicCache
+
+from serving import metrics
+from serving.deadline import DeadlineExceeded, remaining
+from serving.prefix_cache import cache_layers as _layers, build_cache as _build_cache
+
+CONTINUOUS_MAX_BATCH = 8
+
+
+def _pad_left(t: torch.Tensor, width: int, dim: int) -> torch.Tensor:
+    missing = width - t.shape[dim]
+    if missing == 0:
+        return t
+    pad = [0, 0] * (t.dim() - 1 - (dim % t.dim())) + [missing, 0]
+    return F.pad(t, pad)
+
+
+def eos_token_ids(model, tokenizer) -> set:
+    ids = getattr(model.generation_config, "eos_token_id", None)
+    ids = set(ids if isinstance(ids, (list, tuple)) else [ids])
+    ids.add(tokenizer.eos_token_id)
+    ids.discard(None)
+    return ids
+
+
+class _Sequence:
+    __slots__ = ("prompt_ids", "max_new_tokens", "criteria", "future", "tokens",
+                 "adapter", "deadline")
+
+    def __init__(self, prompt_ids, max_new_tokens, criteria, future, adapter,
+                 deadline=None):
+        self.prompt_ids     = prompt_ids
+        self.max_new_tokens = max_new_tokens
+        self.criteria       = criteria
+        self.future         = future
+        self.adapter        = adapter
+        self.deadline       = deadline
+        self.tokens         = []
+
+
+class ContinuousBatchingEngine:
+    """Greedy decode loop whose batch changes at every token boundary."""
+
+    def __init__(self, model, eos_token_ids, max_batch_size: int = CONTINUOUS_MAX_BATCH,
+                 prefix_cache_for=None, forward_context=None,
+                 name: str = "continuous"):
+        """
+        `prefix_cache_for(adapter)` returns a PrefixKVCache to seed prefills,
+        or None. `forward_context(adapters)` is entered around every forward
+        and yields extra kwargs for it (default: none).
+        """
+        self.model            = model
+        self.eos_token_ids    = set(eos_token_ids)
+        self.max_batch_size   = max(1, max_batch_size)
+        self.prefix_cache_for = prefix_cache_for
+        self.forward_context  = forward_context or (lambda adapters: nullcontext({}))
+        self.name             = name
+        self.device           = model.device
+        # Only compute last-position logits during prefill when supported
+        params = inspect.signature(model.forward).parameters
+        self._prefill_kwargs = {"logits_to_keep": 1} if "logits_to_keep" in params else {}
+
+        self._queue  = queue.Queue()
+        self._lock   = threading.Lock()
+        self._thread = None
+        self._rows   = []     # active sequences; row i ↔ batch row i of the cache
+        self._cache  = None   # DynamicCache over all rows
+        self._mask   = None   # (rows, slots), 1 = real token
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._loop, name=self.name, daemon=True)
+                self._thread.start()
+
+    def submit(self, prompt_ids: list, max_new_tokens: int,
+               stopping_criteria=(), adapter: str = None, deadline=None) -> Future:
+        """
+        Queue one prompt (token ids). The Future resolves to the list of
+        generated token ids. `stopping_criteria` are called like generate's,
+        with a (1, prompt + generated) tensor, after every new token. A
+        request still waiting for a slot at `deadline` (time.monotonic)
+        fails with DeadlineExceeded instead of being prefilled.
+        """
+        future = Future()
+        self._ensure_worker()
+        self._queue.put(_Sequence(list(prompt_ids), max_new_tokens,
+                                  list(stopping_criteria), future, adapter, deadline))
+        return future
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def active(self) -> int:
+        return len(self._rows)
+
+    def _loop(self):
+        while True:
+            self._admit()
+            if not self._rows:
+                continue
+            try:
+                with torch.inference_mode():
+                    self._step()
+            except BaseException as e:
+                for seq in self._rows:
+                    seq.future.set_exception(e)
+                self._rows, self._cache, self._mask = [], None, None
+
+    # ── Membership ──────────────────────────────────────────────────────────
+    def _admit(self):
+        while len(self._rows) < self.max_batch_size:
+            try:
+                # Block only when there is nothing to decode
+                seq = self._queue.get(block=not self._rows)
+            except queue.Empty:
+                return
+            if not seq.future.set_running_or_notify_cancel():
+                continue
+            if remaining(seq.deadline) <= 0:
+                seq.future.set_exception(DeadlineExceeded())
+                continue
+            try:
+                with torch.inference_mode():
+                    layers, first = self._prefill(seq)
+                seq.tokens.append(first)
+                if self._finished(seq):
+                    seq.future.set_result(seq.tokens)
+                else:
+                    self._join(seq, layers)
+            except BaseException as e:
+                seq.future.set_exception(e)
+
+    def _prefill(self, seq: _Sequence):
+        ids   = seq.prompt_ids
+        start = 0
+        cache = DynamicCache()
+        prefix = self.prefix_cache_for(seq.adapter) if self.prefix_cache_for else None
+        if prefix is not None:
+            prefix_ids = prefix.input_ids[0].tolist()
+            if ids[:len(prefix_ids)] == prefix_ids:
+                cache = prefix.clone(1)
+                start = len(prefix_ids)
+        with self.forward_context([seq.adapter]) as adapter_kwargs:
+            out = self.model(
+                input_ids=torch.tensor([ids[start:]], device=self.device),
+                attention_mask=torch.ones(1, len(ids), dtype=torch.long, device=self.device),
+                position_ids=torch.arange(start, len(ids), device=self.device)[None],
+                past_key_values=cache, use_cache=True,
+                **self._prefill_kwargs, **adapter_kwargs)
+        return _layers(out.past_key_values), int(out.logits[0, -1].argmax())
+
+    def _join(self, seq: _Sequence, layers: list):
+        mask = torch.ones(1, layers[0][0].shape[-2], dtype=torch.long, device=self.device)
+        if self._cache is None:
+            self._cache, self._mask = _build_cache(layers), mask
+        else:
+            width = max(self._mask.shape[1], mask.shape[1])
+            self._cache = _build_cache([
+                (torch.cat([_pad_left(k, width, -2), _pad_left(nk, width, -2)]),
+                 torch.cat([_pad_left(v, width, -2), _pad_left(nv, width, -2)]))
+                for (k, v), (nk, nv) in zip(_layers(self._cache), layers)])
+            self._mask = torch.cat([_pad_left(self._mask, width, 1),
+                                    _pad_left(mask, width, 1)])
+        self._rows.append(seq)
+
+    def _evict(self, keep: list):
+        self._rows = [self._rows[i] for i in keep]
+        if not keep:
+            self._cache, self._mask = None, None
+            return
+        idx  = torch.tensor(keep, device=self.device)
+        mask = self._mask.index_select(0, idx)
+        # Leading slots that are padding in every remaining row
+        first = int(mask.any(dim=0).long().argmax())
+        self._cache = _build_cache([
+            (k.index_select(0, idx)[..., first:, :], v.index_select(0, idx)[..., first:, :])
+            for k, v in _layers(self._cache)])
+        self._mask = mask[:, first:]
+
+    # ── Decoding ────────────────────────────────────────────────────────────
+    def _step(self):
+        metrics.BATCH_SIZE.observe(len(self._rows), batcher=self.name)
+        last = torch.tensor([[seq.tokens[-1]] for seq in self._rows], device=self.device)
+        # Real tokens already cached = position of the token being fed
+        positions  = self._mask.sum(dim=1, keepdim=True)
+        self._mask = torch.cat([self._mask, torch.ones_like(positions)], dim=1)
+        with self.forward_context([seq.adapter for seq in self._rows]) as adapter_kwargs:
+            out = self.model(input_ids=last, attention_mask=self._mask,
+                             position_ids=positions, past_key_values=self._cache,
+                             use_cache=True, **adapter_kwargs)
+        self._cache = out.past_key_values
+
+        keep = []
+        for i, (seq, token) in enumerate(zip(self._rows,
+                                             out.logits[:, -1].argmax(-1).tolist())):
+            seq.tokens.append(token)
+            if self._finished(seq):
+                seq.future.set_result(seq.tokens)
+            else:
+                keep.append(i)
+        if len(keep) < len(self._rows):
+            self._evict(keep)
+
+    def _finished(self, seq: _Sequence) -> bool:
+        if seq.tokens[-1] in self.eos_token_ids or len(seq.tokens) >= seq.max_new_tokens:
+            return True
+        if not seq.criteria:
+            return False
+        ids = torch.tensor([seq.prompt_ids + seq.tokens], device=self.device)
+        # Call every criterion; some (timers, trackers) keep per-step state
+        stops = [bool(c(ids, None)[0]) for c in seq.criteria]
+        return any(stops)
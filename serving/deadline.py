@@ -0,0 +1,38 @@
+"""
+Per-request deadlines.
+
+When the inference queue is deep, a caller with a latency budget would rather
+have the rule agents' analysis in milliseconds than wait a minute for
+MedGemma. A request may carry a deadline (AssessmentRequest.deadline_ms, or
+AYURVEDA_DEADLINE_MS by default). It is turned into an absolute monotonic
+time on arrival and travels in the pipeline state, like the cancellation
+token. If GuidanceAgent cannot start generating before it, the pipeline
+skips the model and returns a degraded assessment rendered from the rule
+agents instead. The deadline is checked before queueing for the executor,
+and again wherever the request waits for the model: when the MicroBatcher
+forms its batch and when the continuous engine admits it. An expired
+request is failed there with DeadlineExceeded rather than generated.
+"""
+import os
+import time
+
+# 0 = no deadline unless the request sets one
+DEFAULT_DEADLINE_MS = int(os.environ.get("AYURVEDA_DEADLINE_MS", "0"))
+
+
+class DeadlineExceeded(RuntimeError):
+    """Raised in place of a result when the request expired before generation."""
+
+    def __init__(self):
+        super().__init__("Request deadline passed before generation started")
+
+
+def deadline_after(ms: int = None):
+    """Absolute deadline `ms` from now (default AYURVEDA_DEADLINE_MS); None if unset."""
+    ms = DEFAULT_DEADLINE_MS if ms is None else ms
+    return time.monotonic() + ms / 1000 if ms and ms > 0 else None
+
+
+def remaining(deadline) -> float:
+    """Seconds left before `deadline` (negative once passed); inf without one."""
+    return float("inf") if deadline is None else deadline - time.monotonic()
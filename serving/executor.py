@@ -0,0 +1,128 @@
+"""
+Bounded inference executor.
+
+Model calls (GuidanceAgent / VisionAgent) block for seconds. Running them on
+the uvicorn event loop freezes every other route, so they are handed to a
+dedicated thread pool instead. Admission is capped at `workers + queue_size`
+in-flight calls; beyond that `submit` raises QueueFullError immediately so the
+API can shed load with a Retry-After hint instead of letting requests pile up
+and time out.
+"""
+import asyncio
+import contextvars
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from serving import tracing
+
+INFERENCE_WORKERS    = int(os.environ.get("AYURVEDA_INFERENCE_WORKERS", "4"))
+INFERENCE_QUEUE_SIZE = int(os.environ.get("AYURVEDA_INFERENCE_QUEUE_SIZE", "8"))
+DEFAULT_RETRY_AFTER  = int(os.environ.get("AYURVEDA_RETRY_AFTER", "10"))
+
+
+class QueueFullError(RuntimeError):
+    """Raised when no admission slot is free; carries a Retry-After hint."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Inference queue is full, retry later")
+        self.retry_after = retry_after
+
+
+class InferenceExecutor:
+    """Thread pool with a bounded admission queue for blocking model calls."""
+
+    def __init__(self, workers: int = INFERENCE_WORKERS,
+                 queue_size: int = INFERENCE_QUEUE_SIZE):
+        self.workers    = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self._pool  = ThreadPoolExecutor(max_workers=self.workers,
+                                         thread_name_prefix="inference")
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+        self._lock  = threading.Lock()
+        self._admitted = 0
+        self._running  = 0
+        self._rejected = 0
+        self._avg_seconds = None   # EWMA of call duration, for Retry-After
+
+    def _call(self, submitted, fn, args, kwargs):
+        with self._lock:
+            self._running += 1
+        start = time.perf_counter()
+        tracing.record("executor.queue", submitted, start)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._running -= 1
+                self._avg_seconds = (elapsed if self._avg_seconds is None
+                                     else 0.8 * self._avg_seconds + 0.2 * elapsed)
+
+    def _release(self, _future):
+        with self._lock:
+            self._admitted -= 1
+        self._slots.release()
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free, estimated from recent calls."""
+        with self._lock:
+            avg, admitted = self._avg_seconds, self._admitted
+        if avg is None:
+            return DEFAULT_RETRY_AFTER
+        return max(1, math.ceil(avg * admitted / self.workers))
+
+    def start_delay(self) -> float:
+        """Estimated seconds before a call submitted now would start running."""
+        with self._lock:
+            avg, ahead = self._avg_seconds, self._admitted - self.workers + 1
+        if avg is None or ahead <= 0:
+            return 0.0
+        return avg * ahead / self.workers
+
+    def submit(self, fn, *args, **kwargs):
+        """Schedule `fn` on the pool; raises QueueFullError when saturated."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise QueueFullError(self.retry_after())
+        with self._lock:
+            self._admitted += 1
+        try:
+            # The worker runs in the caller's context, so trace spans nest
+            future = self._pool.submit(contextvars.copy_context().run, self._call,
+                                       time.perf_counter(), fn, args, kwargs)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, fn, *args, **kwargs):
+        """Awaitable form of `submit` for async route handlers."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers":    self.workers,
+                "queue_size": self.queue_size,
+                "running":    self._running,
+                "queued":     self._admitted - self._running,
+                "rejected":   self._rejected,
+            }
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+# Singleton executor instance
+_executor = None
+
+def get_executor() -> InferenceExecutor:
+    global _executor
+    if _executor is None:
+        _executor = InferenceExecutor()
+    return _executor
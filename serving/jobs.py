@@ -0,0 +1,175 @@
+"""
+Persistent asynchronous assessment jobs.
+
+Long generations outlive HTTP client and proxy timeouts, so clients can submit
+a job, get an id back at once, and poll for the result. Jobs live in a SQLite
+table; anything queued or running when the server stops is picked up again
+on the next start. Finished results are kept for AYURVEDA_JOB_TTL seconds
+and then removed by the runner's periodic cleanup.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from serving.executor import QueueFullError
+
+JOBS_PATH        = os.environ.get("AYURVEDA_JOBS_PATH", "cache/jobs.sqlite")
+JOB_WORKERS      = int(os.environ.get("AYURVEDA_JOB_WORKERS", "2"))
+JOB_TTL_SECONDS  = float(os.environ.get("AYURVEDA_JOB_TTL", str(24 * 3600)))
+CLEANUP_INTERVAL = 300
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class JobStore:
+    """SQLite-backed job table; safe to share between threads."""
+
+    def __init__(self, path: str = JOBS_PATH, ttl_seconds: float = JOB_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " id TEXT UNIQUE NOT NULL, status TEXT NOT NULL,"
+            " request TEXT NOT NULL, result TEXT, error TEXT,"
+            " created_at REAL NOT NULL, started_at REAL,"
+            " finished_at REAL, expires_at REAL)"
+        )
+        # Jobs interrupted by a restart go back to the front of the queue
+        self._db.execute("UPDATE jobs SET status = ?, started_at = NULL "
+                         "WHERE status = ?", (QUEUED, RUNNING))
+        self._db.commit()
+
+    def submit(self, request: dict) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, status, request, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, QUEUED, json.dumps(request), time.time()))
+            self._db.commit()
+        return job_id
+
+    def get(self, job_id: str):
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?",
+                                   (job_id,)).fetchone()
+            if row is None:
+                return None
+            job = dict(row)
+            job["request"] = json.loads(job["request"])
+            job["queue_position"] = None
+            if job["status"] == QUEUED:
+                job["queue_position"] = self._db.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = ? AND seq < ?",
+                    (QUEUED, job["seq"])).fetchone()[0]
+            return job
+
+    def claim_next(self):
+        """Mark the oldest queued job running and return it (or None)."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, request FROM jobs WHERE status = ? ORDER BY seq LIMIT 1",
+                (QUEUED,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE jobs SET status = ?, started_at = ? WHERE id = ?",
+                             (RUNNING, time.time(), row["id"]))
+            self._db.commit()
+            return row["id"], json.loads(row["request"])
+
+    def requeue(self, job_id: str):
+        with self._lock:
+            self._db.execute("UPDATE jobs SET status = ?, started_at = NULL "
+                             "WHERE id = ?", (QUEUED, job_id))
+            self._db.commit()
+
+    def finish(self, job_id: str, result: str = None, error: str = None):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?,"
+                " finished_at = ?, expires_at = ? WHERE id = ?",
+                (FAILED if error is not None else DONE, result, error,
+                 now, now + self.ttl_seconds, job_id))
+            self._db.commit()
+
+    def cleanup(self) -> int:
+        """Delete finished jobs whose results have expired."""
+        with self._lock:
+            removed = self._db.execute(
+                "DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                (time.time(),)).rowcount
+            self._db.commit()
+            return removed
+
+    def counts(self) -> dict:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0,
+                **{status: n for status, n in rows}}
+
+
+class JobRunner:
+    """Worker threads that feed queued jobs into the inference executor."""
+
+    def __init__(self, store: JobStore, executor, handler, workers: int = JOB_WORKERS):
+        self.store    = store
+        self.executor = executor
+        self.handler  = handler
+        self.workers  = max(1, workers)
+        self._wake    = threading.Event()
+        self._stop    = threading.Event()
+        self._threads = []
+        self._last_cleanup = 0.0
+
+    def start(self):
+        for i in range(self.workers):
+            t = threading.Thread(target=self._loop, name=f"job-runner-{i}",
+                                 daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def notify(self):
+        """Wake an idle worker after a submit."""
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._maybe_cleanup()
+            claimed = self.store.claim_next()
+            if claimed is None:
+                self._wake.wait(timeout=1.0)
+                self._wake.clear()
+                continue
+            job_id, request = claimed
+            try:
+                future = self.executor.submit(self.handler, **request)
+            except QueueFullError as e:
+                # Interactive traffic has the slots; try again shortly
+                self.store.requeue(job_id)
+                self._stop.wait(timeout=min(e.retry_after, 1.0))
+                continue
+            try:
+                self.store.finish(job_id, result=future.result())
+            except Exception as e:
+                self.store.finish(job_id, error=str(e))
+
+    def _maybe_cleanup(self):
+        now = time.monotonic()
+        if now - self._last_cleanup >= CLEANUP_INTERVAL:
+            self._last_cleanup = now
+            removed = self.store.cleanup()
+            if removed:
+                print(f"[JobRunner] Removed {removed} expired jobs")
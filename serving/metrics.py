@@ -0,0 +1,246 @@
+"""
+Prometheus-style metrics for the Ayurveda AI server.
+
+A deliberately small, dependency-free implementation of counters, gauges and
+histograms rendered in the Prometheus text exposition format (served at
+/metrics). All metric objects are defined here so every name lives in one
+place; instrumented code imports the one it needs and calls inc/set/observe.
+
+Gauges that mirror state owned elsewhere (queue depth, cache hit rate, RSS)
+are refreshed at scrape time by collectors registered with
+`register_collector`.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+TOKEN_RATE_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 300)
+BATCH_BUCKETS = (1, 2, 3, 4, 6, 8, 12, 16, 32)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_str(labelnames, values, extra=()) -> str:
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name       = name
+        self.help       = help
+        self.labelnames = tuple(labelnames)
+        self._lock      = threading.Lock()
+        self._values    = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(n, "") for n in self.labelnames)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_str(self.labelnames, key)} {value}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total, n = self._values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            for i, upper in enumerate(self.buckets):
+                if value <= upper:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value, n + 1)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for key, (counts, total, n) in sorted(self._values.items()):
+                for upper, count in zip(self.buckets, counts):
+                    lines.append(f"{self.name}_bucket"
+                                 f"{_label_str(self.labelnames, key, [('le', upper)])} {count}")
+                lines.append(f"{self.name}_bucket"
+                             f"{_label_str(self.labelnames, key, [('le', '+Inf')])} {n}")
+                lines.append(f"{self.name}_sum{_label_str(self.labelnames, key)} {total}")
+                lines.append(f"{self.name}_count{_label_str(self.labelnames, key)} {n}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics    = []
+        self._collectors = []
+
+    def add(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, fn):
+        """`fn()` runs before every scrape to refresh mirrored gauges."""
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        for fn in self._collectors:
+            try:
+                fn()
+            except Exception as e:
+                print(f"[metrics] collector {fn.__name__} failed: {e}")
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+register_collector = REGISTRY.register_collector
+render = REGISTRY.render
+
+
+# ── Pipeline ─────────────────────────────────────────────────────────────────
+NODE_LATENCY = REGISTRY.add(Histogram(
+    "ayurveda_node_latency_seconds",
+    "Wall time of each pipeline node (symptom, vision, dosha, guidance, safety)",
+    ["node"]))
+NODE_ERRORS = REGISTRY.add(Counter(
+    "ayurveda_node_errors_total", "Pipeline node invocations that raised", ["node"]))
+
+# ── Generation ───────────────────────────────────────────────────────────────
+PROMPT_TOKENS = REGISTRY.add(Counter(
+    "ayurveda_prompt_tokens_total", "Prompt tokens fed to the model", ["agent"]))
+GENERATED_TOKENS = REGISTRY.add(Counter(
+    "ayurveda_generated_tokens_total", "Tokens generated by the model", ["agent"]))
+TIME_TO_FIRST_TOKEN = REGISTRY.add(Histogram(
+    "ayurveda_time_to_first_token_seconds",
+    "Time from generate() start to the first generated token", ["agent"]))
+TOKENS_PER_SECOND = REGISTRY.add(Histogram(
+    "ayurveda_decode_tokens_per_second",
+    "Per-request decode throughput after the first token", ["agent"],
+    buckets=TOKEN_RATE_BUCKETS))
+PREFIX_TOKENS_REUSED = REGISTRY.add(Counter(
+    "ayurveda_prefix_tokens_reused_total",
+    "Prompt tokens taken from the prefix KV cache instead of prefilled"))
+CANCELLED_GENERATIONS = REGISTRY.add(Counter(
+    "ayurveda_cancelled_generations_total",
+    "Generations cancelled, by stage (queued = never started, decoding = stopped early)",
+    ["agent", "stage"]))
+CLIENT_DISCONNECTS = REGISTRY.add(Counter(
+    "ayurveda_client_disconnects_total",
+    "Requests whose HTTP client went away before the response", ["endpoint"]))
+EARLY_STOPS = REGISTRY.add(Counter(
+    "ayurveda_early_stops_total",
+    "Generations ended by a stop rule before EOS or max_new_tokens",
+    ["agent", "reason"]))
+EARLY_STOP_TOKENS_SAVED = REGISTRY.add(Counter(
+    "ayurveda_early_stop_tokens_saved_total",
+    "Unused max_new_tokens budget when a stop rule fired (upper bound on tokens saved)",
+    ["agent", "reason"]))
+ADAPTER_REQUESTS = REGISTRY.add(Counter(
+    "ayurveda_adapter_requests_total", "GuidanceAgent generations per LoRA adapter",
+    ["adapter"]))
+ADAPTER_GENERATED_TOKENS = REGISTRY.add(Counter(
+    "ayurveda_adapter_generated_tokens_total", "Tokens generated per LoRA adapter",
+    ["adapter"]))
+ADAPTER_DECODE_TPS = REGISTRY.add(Histogram(
+    "ayurveda_adapter_decode_tokens_per_second",
+    "Per-request decode throughput per LoRA adapter", ["adapter"],
+    buckets=TOKEN_RATE_BUCKETS))
+ADAPTER_RELOADS = REGISTRY.add(Counter(
+    "ayurveda_adapter_reloads_total",
+    "Adapter hot reloads by outcome (swapped, failed)", ["adapter", "outcome"]))
+ASSESSMENTS = REGISTRY.add(Counter(
+    "ayurveda_assessments_total",
+    "Assessments generated (cache hits excluded), by mode (full, degraded)", ["mode"]))
+DEGRADED_ASSESSMENTS = REGISTRY.add(Counter(
+    "ayurveda_degraded_assessments_total",
+    "Assessments rendered without GuidanceAgent, by reason "
+    "(queue_wait, queue_full, deadline)", ["reason"]))
+BATCH_SIZE = REGISTRY.add(Histogram(
+    "ayurveda_batch_size", "Items per batched model call", ["batcher"],
+    buckets=BATCH_BUCKETS))
+
+# ── Serving state (refreshed by collectors) ──────────────────────────────────
+QUEUE_DEPTH = REGISTRY.add(Gauge(
+    "ayurveda_queue_depth", "Requests waiting or running, by queue", ["queue", "state"]))
+CACHE_EVENTS = REGISTRY.add(Gauge(
+    "ayurveda_cache_events", "Assessment cache lookups by outcome", ["outcome"]))
+CACHE_HIT_RATE = REGISTRY.add(Gauge(
+    "ayurveda_cache_hit_rate", "Assessment cache hit rate since start"))
+DEGRADATION_RATE = REGISTRY.add(Gauge(
+    "ayurveda_degradation_rate", "Share of generated assessments served degraded since start"))
+MODEL_LOAD_SECONDS = REGISTRY.add(Gauge(
+    "ayurveda_model_load_seconds", "Model load time by component", ["component"]))
+MODEL_MEMORY_BYTES = REGISTRY.add(Gauge(
+    "ayurveda_model_memory_bytes", "Parameter memory by model component", ["component"]))
+ADAPTER_IN_FLIGHT = REGISTRY.add(Gauge(
+    "ayurveda_adapter_in_flight", "Requests currently pinned to each loaded adapter",
+    ["adapter"]))
+PROCESS_RSS_BYTES = REGISTRY.add(Gauge(
+    "ayurveda_process_resident_memory_bytes", "Resident set size of the server"))
+
+
+def process_rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _collect_process():
+    PROCESS_RSS_BYTES.set(process_rss_bytes())
+
+register_collector(_collect_process)
+
+
+def _collect_degradation():
+    degraded = ASSESSMENTS.value(mode="degraded")
+    total    = degraded + ASSESSMENTS.value(mode="full")
+    DEGRADATION_RATE.set(degraded / total if total else 0.0)
+
+register_collector(_collect_degradation)
@@ -0,0 +1,615 @@
+"""
+Process-wide MedGemma model registry.
+
+GuidanceAgent (text + LoRA) and VisionAgent (image + base weights) both use
+google/medgemma-4b-it. Loading it twice doubles resident memory and cold
+start, so the registry loads the multimodal checkpoint once, attaches the
+Ayurveda LoRA adapter on top, and hands out two views of the same weights:
+
+  text_model()   → PeftModel with the adapter active (GuidanceAgent)
+  vision_model() → same PeftModel, run with the adapter bypassed (VisionAgent)
+
+Which adapter a row goes through is model-wide state in PEFT: even the
+per-row `adapter_names` argument works by registering forward hooks on the
+shared LoRA layers for the duration of the call. Two threads generating at
+once would therefore route each other's rows, silently. Every forward or
+generate call on the registry's models is made inside `generating(peft_names)`,
+which holds `model_lock` for the call and routes each row to its adapter
+(BASE_ADAPTER for the plain base weights): a batch on one adapter just
+activates it, and only a batch that mixes adapters pays for PEFT's per-row
+`adapter_names` path. Loading and deleting adapters take the same lock.
+
+The same mechanism serves several named LoRA adapters on the one base model:
+"default" is LORA_PATH, more can be listed in AYURVEDA_ADAPTERS or loaded and
+unloaded at runtime. Every text generation names the adapter of each row,
+so one batch may mix adapters. Requests hold their adapter through
+`use_adapter()`, and an unloaded adapter is only deleted from the model once
+the last request using it has finished. `reload_adapter()` builds on this for
+zero-downtime deploys: the new version loads next to the old one, is
+validated, and then replaces it for new requests while in-flight ones finish
+on the old weights.
+
+AYURVEDA_SERVING_MODE=merged instead loads the checkpoint written by
+scripts/merge_lora.py, where the adapter is folded into the base weights and
+forward passes skip the extra LoRA matmuls. Merged weights can no longer be
+bypassed, so in that mode vision_model() loads the plain base checkpoint
+separately on first use.
+
+On CPU-only nodes (AYURVEDA_DEVICE=cpu, or auto without CUDA) the weights
+load in AYURVEDA_CPU_DTYPE, torch's intra-op pool is sized from
+AYURVEDA_CPU_THREADS, and the language model's linear layers can be
+quantized to int8 with AYURVEDA_QUANTIZE:
+
+  dynamic_int8 → torch.ao dynamic quantization (int8 weights, fp32 activations)
+  weight_int8  → torchao weight-only int8 (activations stay in CPU_DTYPE)
+
+Only decoder linears are quantized; the vision tower, the LoRA matrices and
+lm_head keep their dtype.
+
+Every checkpoint is located through serving.resolver first (local directory
+or hub cache, no network by default), and the tokenizer comes from the
+adapter directory. Resolve, verify and load times all land in `load_seconds`.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+import torch
+from transformers import (AutoProcessor, AutoModelForImageTextToText,
+                          AutoModelForCausalLM, AutoTokenizer)
+from peft import PeftModel
+from serving.resolver import ModelResolver, ModelResolutionError, ADAPTER_FILES
+
+BASE_MODEL  = "google/medgemma-4b-it"
+LORA_PATH   = "models/medgemma-ayurveda-lora/final"
+MERGED_PATH = os.environ.get("AYURVEDA_MERGED_PATH", "models/medgemma-ayurveda-merged")
+MODEL_DTYPE = torch.bfloat16
+
+ADAPTER_MODE, MERGED_MODE = "adapter", "merged"
+SERVING_MODE = os.environ.get("AYURVEDA_SERVING_MODE", ADAPTER_MODE)
+
+# Small model sharing Gemma 3's tokenizer, used to draft speculative tokens
+DRAFT_MODEL = os.environ.get("AYURVEDA_DRAFT_MODEL", "google/gemma-3-270m-it")
+
+DEVICE       = os.environ.get("AYURVEDA_DEVICE", "auto")          # auto | cuda | cpu
+CPU_DTYPE    = os.environ.get("AYURVEDA_CPU_DTYPE", "bfloat16")   # bfloat16 | float32
+QUANTIZATION = os.environ.get("AYURVEDA_QUANTIZE", "none")        # none | dynamic_int8 | weight_int8
+CPU_THREADS  = int(os.environ.get("AYURVEDA_CPU_THREADS", "0"))   # 0 = torch default
+QUANTIZATION_MODES = ("none", "dynamic_int8", "weight_int8")
+
+# Written next to the merged weights by scripts/merge_lora.py
+MERGE_INFO_FILE = "merge_info.json"
+
+# PEFT's reserved adapter name for "no adapter" in mixed batches
+BASE_ADAPTER = "__base__"
+
+# Adapter served when a request does not name one (LORA_PATH)
+DEFAULT_ADAPTER = "default"
+# Extra adapters loaded at startup: "name=path,name=path"
+EXTRA_ADAPTERS = os.environ.get("AYURVEDA_ADAPTERS", "")
+
+
+def _param_bytes(model) -> dict:
+    """Parameter memory grouped by component of the multimodal model."""
+    sizes = {"language_model": 0, "vision_tower": 0,
+             "multi_modal_projector": 0, "lora_adapter": 0}
+    for name, p in model.named_parameters():
+        if "lora_" in name:
+            key = "lora_adapter"
+        elif "vision_tower" in name:
+            key = "vision_tower"
+        elif "multi_modal_projector" in name:
+            key = "multi_modal_projector"
+        else:
+            key = "language_model"
+        sizes[key] += p.numel() * p.element_size()
+    return sizes
+
+
+def _hash_files(directory: str, names) -> str:
+    digest = hashlib.sha256()
+    for name in names:
+        with open(os.path.join(directory, name), "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _decoder_linears(model) -> list:
+    """Names of the language model's nn.Linear layers, excluding LoRA A/B."""
+    return [name for name, module in model.named_modules()
+            if isinstance(module, torch.nn.Linear)
+            and "language_model" in name and "lora_" not in name]
+
+
+def quantize_int8(model, method: str):
+    """Quantize the decoder linears of `model` in place (CPU only)."""
+    names = set(_decoder_linears(model))
+    if method == "dynamic_int8":
+        torch.ao.quantization.quantize_dynamic(
+            model, qconfig_spec=names, dtype=torch.qint8, inplace=True)
+    elif method == "weight_int8":
+        try:
+            from torchao.quantization import quantize_, int8_weight_only
+        except ImportError as e:
+            raise RuntimeError("AYURVEDA_QUANTIZE=weight_int8 needs torchao "
+                               "(pip install torchao)") from e
+        quantize_(model, int8_weight_only(),
+                  filter_fn=lambda module, fqn: fqn in names)
+    return model
+
+
+@contextmanager
+def route_adapters(model, peft_names: list):
+    """
+    Route one call of the PeftModel `model` whose row i runs through
+    `peft_names[i]`; yields the kwargs for that call. Only a batch that mixes
+    adapters passes `adapter_names` (PEFT then splits every LoRA matmul by
+    row); otherwise the one adapter is made active, or disabled for
+    BASE_ADAPTER. All three are model-wide, so the caller must keep other
+    threads off the model until the call returns.
+    """
+    names = set(peft_names)
+    if len(names) > 1:
+        yield {"adapter_names": list(peft_names)}
+    elif names == {BASE_ADAPTER}:
+        with model.disable_adapter():
+            yield {}
+    else:
+        name = next(iter(names), None)
+        if name is not None and model.active_adapter != name:
+            model.set_adapter(name)
+        yield {}
+
+
+def read_merge_info(merged_path: str = MERGED_PATH) -> dict:
+    with open(os.path.join(merged_path, MERGE_INFO_FILE)) as f:
+        return json.load(f)
+
+
+class UnknownAdapterError(KeyError):
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.name = name
+
+    def __str__(self):
+        return f"Unknown adapter {self.name!r}"
+
+
+class Adapter:
+    """A named LoRA adapter attached to the shared model."""
+
+    def __init__(self, name: str, path: str, peft_name: str = None, hash: str = None,
+                 hash_fn=None):
+        """`hash_fn` computes the hash when none is given (default: hash the files)."""
+        self.name      = name
+        self.path      = path
+        self.peft_name = peft_name   # None when served from merged weights
+        self._hash     = hash
+        self._hash_fn  = hash_fn or (lambda: _hash_files(path, ADAPTER_FILES))
+        self.in_flight = 0
+        self.retired   = False
+
+    @property
+    def hash(self) -> str:
+        """
+        SHA-256 of the adapter files (no model load needed). Loaders pass it
+        in, hashed just before the weights are read, so files replaced in
+        place later are never credited to the weights actually served.
+        """
+        if self._hash is None:
+            self._hash = self._hash_fn()
+        return self._hash
+
+    def info(self) -> dict:
+        try:
+            hash = self.hash
+        except OSError:
+            hash = None   # files missing; loading reports why
+        return {"path": self.path, "hash": hash, "peft_name": self.peft_name,
+                "in_flight": self.in_flight}
+
+
+def _parse_adapters(spec: str) -> dict:
+    adapters = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, path = item.partition("=")
+        adapters[name.strip()] = path.strip()
+    return adapters
+
+
+class ModelRegistry:
+    """Loads the shared MedGemma + LoRA weights once per process."""
+
+    def __init__(self, base_model: str = BASE_MODEL, lora_path: str = LORA_PATH,
+                 mode: str = SERVING_MODE, merged_path: str = MERGED_PATH,
+                 device: str = DEVICE, cpu_dtype: str = CPU_DTYPE,
+                 quantization: str = QUANTIZATION, cpu_threads: int = CPU_THREADS,
+                 extra_adapters: str = EXTRA_ADAPTERS, resolver: ModelResolver = None):
+        if mode not in (ADAPTER_MODE, MERGED_MODE):
+            raise ValueError(f"Unknown serving mode {mode!r}; "
+                             f"expected {ADAPTER_MODE!r} or {MERGED_MODE!r}")
+        if quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization {quantization!r}; "
+                             f"expected one of {QUANTIZATION_MODES}")
+        if device == "auto":
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+        if device != "cpu" and quantization != "none":
+            raise ValueError("int8 quantization is only supported on the CPU backend")
+        self.base_model   = base_model
+        self.lora_path    = lora_path
+        self.mode         = mode
+        self.merged_path  = merged_path
+        self.device       = device
+        self.quantization = quantization
+        self.cpu_threads  = cpu_threads
+        self.resolver     = resolver or ModelResolver()
+        if device == "cpu":
+            # Dynamic int8 kernels take fp32 activations
+            self.dtype = (torch.float32 if quantization == "dynamic_int8"
+                          else getattr(torch, cpu_dtype))
+        else:
+            self.dtype = MODEL_DTYPE
+        self._lock       = threading.Lock()
+        # Held around every use of the loaded models; see generating()
+        self.model_lock  = threading.RLock()
+        self._model      = None
+        self._processor  = None
+        self._vision     = None
+        self._draft      = None
+        self.load_seconds = {}
+        self.memory_bytes = {}
+
+        self._adapter_lock = threading.Lock()
+        self._versions     = {}
+        self._merge_info   = None
+        if mode == MERGED_MODE:
+            self._adapters = {DEFAULT_ADAPTER: Adapter(
+                DEFAULT_ADAPTER, merged_path,
+                # The adapter the merged weights were built from, read on first use
+                hash_fn=lambda: self.merge_info()["adapter_hash"])}
+        else:
+            self._adapters = {DEFAULT_ADAPTER: Adapter(
+                DEFAULT_ADAPTER, lora_path, peft_name=DEFAULT_ADAPTER)}
+            for name, path in _parse_adapters(extra_adapters).items():
+                self._check_name(name)
+                self._adapters[name] = Adapter(name, path, peft_name=name)
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def _load_processor(self, source: str, tokenizer_source: str = None):
+        hub = self.resolver.hub_kwargs()
+        tokenizer = AutoTokenizer.from_pretrained(tokenizer_source or source, **hub)
+        processor = AutoProcessor.from_pretrained(source, tokenizer=tokenizer, **hub)
+        processor.tokenizer.pad_token    = processor.tokenizer.eos_token
+        processor.tokenizer.padding_side = "left"   # batched generation
+        return processor
+
+    def _from_pretrained(self, source: str, **kwargs):
+        return AutoModelForImageTextToText.from_pretrained(
+            source, dtype=self.dtype,
+            device_map="auto" if self.device == "cuda" else self.device,
+            **self.resolver.hub_kwargs(), **kwargs)
+
+    def _load(self):
+        with self._lock:
+            if self._model is not None:
+                return
+            if self.device == "cpu" and self.cpu_threads > 0:
+                torch.set_num_threads(self.cpu_threads)
+            if self.mode == MERGED_MODE:
+                self._load_merged()
+            else:
+                self._load_adapter()
+            if self.quantization != "none":
+                start = time.perf_counter()
+                quantize_int8(self._model, self.quantization)
+                self.load_seconds["quantize"] = time.perf_counter() - start
+            self.load_seconds.update(self.resolver.seconds)
+            print(f"[ModelRegistry] Ready! {self.report()}")
+
+    def backend(self) -> dict:
+        """Device settings that change numerics (part of the cache key)."""
+        return {"device": self.device, "dtype": str(self.dtype),
+                "quantization": self.quantization}
+
+    def _load_adapter(self):
+        print("[ModelRegistry] Loading MedGemma (shared text + vision)...")
+        # Resolve and check every file before the slow loads start
+        base_dir = self.resolver.resolve(self.base_model, "base")
+        default  = self._adapters[DEFAULT_ADAPTER]
+        for adapter in self._adapters.values():
+            self.resolver.adapter(adapter.path,
+                                  "adapter" if adapter is default else None)
+            adapter.hash   # fingerprint the files we are about to load
+
+        start = time.perf_counter()
+        # Tokenizer + chat template as shipped with the fine-tune
+        processor = self._load_processor(
+            base_dir, self.resolver.tokenizer_source(default.path, base_dir))
+        self.load_seconds["processor"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        base = self._from_pretrained(base_dir)
+        self.load_seconds["base_model"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        model = PeftModel.from_pretrained(base, default.path,
+                                          adapter_name=default.peft_name)
+        for adapter in self._adapters.values():
+            if adapter is not default:
+                model.load_adapter(adapter.path, adapter_name=adapter.peft_name)
+        model.eval()
+        self.load_seconds["lora_adapter"] = time.perf_counter() - start
+
+        self.memory_bytes = _param_bytes(model)
+        self._processor   = processor
+        self._model       = model
+
+    def merge_info(self) -> dict:
+        """merge_info.json written next to the merged weights by merge_lora.py."""
+        if self._merge_info is None:
+            try:
+                self._merge_info = read_merge_info(self.merged_path)
+            except FileNotFoundError:
+                raise ModelResolutionError(
+                    f"No {MERGE_INFO_FILE} in {self.merged_path}; write the merged "
+                    f"checkpoint with `python scripts/merge_lora.py --output "
+                    f"{self.merged_path}`") from None
+        return self._merge_info
+
+    def _load_merged(self):
+        print(f"[ModelRegistry] Loading merged MedGemma from {self.merged_path}...")
+        merged_dir = self.resolver.resolve(self.merged_path, "merged",
+                                           local_dir=self.merged_path)
+        info = self.merge_info()
+        self._adapters[DEFAULT_ADAPTER].hash   # before the weights are read
+
+        start = time.perf_counter()
+        # Tokenizer + chat template of the fine-tune the weights were merged from
+        processor = self._load_processor(
+            merged_dir, self.resolver.tokenizer_source(info.get("adapter_path"), merged_dir))
+        self.load_seconds["processor"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        model = self._from_pretrained(merged_dir)
+        model.eval()
+        self.load_seconds["merged_model"] = time.perf_counter() - start
+
+        self.memory_bytes = _param_bytes(model)
+        self._processor   = processor
+        self._model       = model
+
+    def _load_vision_base(self):
+        """Plain base checkpoint for VisionAgent when the text weights are merged."""
+        with self._lock:
+            if self._vision is not None:
+                return
+            print("[ModelRegistry] Loading base MedGemma for VisionAgent...")
+            base_dir = self.resolver.resolve(self.base_model, "base")
+            start = time.perf_counter()
+            model = self._from_pretrained(base_dir)
+            model.eval()
+            self.load_seconds["vision_base_model"] = time.perf_counter() - start
+            self.memory_bytes["vision_base_model"] = sum(
+                _param_bytes(model).values())
+            self._vision = model
+
+    def draft_model(self, name: str = DRAFT_MODEL):
+        """(model, tokenizer) for speculative-decoding drafts, loaded on first use."""
+        self._load()
+        with self._lock:
+            if self._draft is None:
+                print(f"[ModelRegistry] Loading draft model {name}...")
+                source = self.resolver.resolve(name, "draft")
+                start = time.perf_counter()
+                hub = self.resolver.hub_kwargs()
+                tokenizer = AutoTokenizer.from_pretrained(source, **hub)
+                model = AutoModelForCausalLM.from_pretrained(
+                    source, **hub, dtype=self.dtype,
+                    device_map="auto" if self.device == "cuda" else self.device)
+                model.eval()
+                self.load_seconds["draft_model"] = time.perf_counter() - start
+                self.memory_bytes["draft_model"] = sum(_param_bytes(model).values())
+                self._draft = (model, tokenizer)
+        return self._draft
+
+    # ── Adapters ────────────────────────────────────────────────────────────
+    @staticmethod
+    def _check_name(name: str):
+        if not name or name == BASE_ADAPTER or "@" in name:
+            raise ValueError(f"Invalid adapter name {name!r}")
+
+    def get_adapter(self, name: str = None) -> Adapter:
+        with self._adapter_lock:
+            adapter = self._adapters.get(name or DEFAULT_ADAPTER)
+        if adapter is None:
+            raise UnknownAdapterError(name)
+        return adapter
+
+    @property
+    def adapter_hash(self) -> str:
+        """SHA-256 of the default adapter's files."""
+        return self.get_adapter(DEFAULT_ADAPTER).hash
+
+    def adapters(self) -> dict:
+        with self._adapter_lock:
+            return {name: a.info() for name, a in self._adapters.items()}
+
+    @contextmanager
+    def use_adapter(self, name: str = None):
+        """
+        Pin an adapter for one request. The yielded Adapter's `peft_name` stays
+        valid until the block exits, even if the adapter is unloaded meanwhile.
+        """
+        with self._adapter_lock:
+            adapter = self._adapters.get(name or DEFAULT_ADAPTER)
+            if adapter is None:
+                raise UnknownAdapterError(name)
+            adapter.in_flight += 1
+        try:
+            yield adapter
+        finally:
+            with self._adapter_lock:
+                adapter.in_flight -= 1
+                drained = adapter.retired and adapter.in_flight == 0
+            if drained:
+                self._delete(adapter)
+
+    @contextmanager
+    def generating(self, peft_names: list):
+        """
+        Hold the shared model for one generate()/forward call whose row i runs
+        through `peft_names[i]`; yields the kwargs to pass to that call.
+        """
+        with self.model_lock:
+            if self.mode == MERGED_MODE:
+                yield {}   # no adapters; vision_model() is the plain base
+            else:
+                with route_adapters(self._model, peft_names) as adapter_kwargs:
+                    yield adapter_kwargs
+
+    def check_adapter_loading(self):
+        """Raise ValueError if adapters cannot be attached at runtime."""
+        if self.mode == MERGED_MODE:
+            raise ValueError("Adapters cannot be loaded in merged serving mode")
+        if self.quantization != "none":
+            # quantize_int8 replaced the Linear layers PEFT would wrap
+            raise ValueError(
+                f"Adapters cannot be loaded into the {self.quantization} quantized "
+                f"model; list them in AYURVEDA_ADAPTERS so they attach before "
+                f"quantization")
+
+    def load_adapter(self, name: str, path: str) -> dict:
+        """Attach another LoRA adapter to the running model."""
+        self.check_adapter_loading()
+        self._check_name(name)
+        self._load()
+        with self._adapter_lock:
+            if name in self._adapters:
+                raise ValueError(f"Adapter {name!r} is already loaded")
+        self.resolver.adapter(path)
+        adapter = Adapter(name, path, peft_name=self._next_peft_name(name),
+                          hash=_hash_files(path, ADAPTER_FILES))
+        start = time.perf_counter()
+        with self.model_lock:
+            self._model.load_adapter(path, adapter_name=adapter.peft_name)
+            self._model.eval()
+            self.memory_bytes["lora_adapter"] = _param_bytes(self._model)["lora_adapter"]
+        self.load_seconds[f"adapter:{name}"] = time.perf_counter() - start
+        with self._adapter_lock:
+            self._adapters[name] = adapter
+        print(f"[ModelRegistry] Loaded adapter {name!r} from {path}")
+        return adapter.info()
+
+    def unload_adapter(self, name: str):
+        """Stop routing to `name`; its weights go once in-flight requests finish."""
+        if name == DEFAULT_ADAPTER:
+            raise ValueError("The default adapter cannot be unloaded")
+        self._load()
+        with self._adapter_lock:
+            adapter = self._adapters.pop(name, None)
+            if adapter is None:
+                raise UnknownAdapterError(name)
+            adapter.retired = True
+            drained = adapter.in_flight == 0
+        if drained:
+            self._delete(adapter)
+
+    def reload_adapter(self, name: str = DEFAULT_ADAPTER, path: str = None,
+                       validate=None) -> dict:
+        """
+        Load a new version of `name` (from `path`, default its current path)
+        next to the running one and call `validate(adapter)`, which raises if
+        the new weights are unusable. Only then are new requests switched to it
+        atomically. The old version is deleted once its in-flight requests end.
+        """
+        self.check_adapter_loading()
+        self._load()
+        current = self.get_adapter(name)
+        self.resolver.adapter(path or current.path)
+        adapter = Adapter(name, path or current.path,
+                          peft_name=self._next_peft_name(name),
+                          hash=_hash_files(path or current.path, ADAPTER_FILES))
+
+        start = time.perf_counter()
+        with self.model_lock:
+            self._model.load_adapter(adapter.path, adapter_name=adapter.peft_name)
+            self._model.eval()
+        try:
+            if validate is not None:
+                validate(adapter)
+        except BaseException:
+            self._delete(adapter)
+            raise
+        with self._adapter_lock:
+            old = self._adapters.get(name)
+            self._adapters[name] = adapter
+            drained = False
+            if old is not None:
+                old.retired = True
+                drained = old.in_flight == 0
+        if drained:
+            self._delete(old)
+        self.load_seconds[f"adapter:{name}"] = time.perf_counter() - start
+        print(f"[ModelRegistry] Reloaded adapter {name!r} as {adapter.peft_name!r}")
+        return {"name": name, **adapter.info(),
+                "previous_hash": current.hash,
+                "reload_seconds": round(time.perf_counter() - start, 2)}
+
+    def _next_peft_name(self, name: str) -> str:
+        # PEFT names stay unique so a reloaded adapter never collides with
+        # a retired one that is still draining
+        with self._adapter_lock:
+            self._versions[name] = self._versions.get(name, 0) + 1
+            return f"{name}@{self._versions[name]}"
+
+    def _delete(self, adapter: Adapter):
+        with self.model_lock:
+            self._model.delete_adapter(adapter.peft_name)
+            self.memory_bytes["lora_adapter"] = _param_bytes(self._model)["lora_adapter"]
+        with self._adapter_lock:
+            served = adapter.name in self._adapters
+        if not served:
+            self.load_seconds.pop(f"adapter:{adapter.name}", None)
+        print(f"[ModelRegistry] Unloaded adapter {adapter.peft_name!r}")
+
+    def text_model(self):
+        """(model, tokenizer); call the model only inside generating()."""
+        self._load()
+        return self._model, self._processor.tokenizer
+
+    def vision_model(self):
+        """(model, processor); generate inside generating([BASE_ADAPTER] * rows)."""
+        self._load()
+        if self.mode == MERGED_MODE:
+            self._load_vision_base()
+            return self._vision, self._processor
+        return self._model, self._processor
+
+    def report(self) -> dict:
+        return {
+            "mode":         self.mode,
+            **self.backend(),
+            "threads":      torch.get_num_threads() if self.device == "cpu" else None,
+            "loaded":       self.loaded,
+            "adapters":     self.adapters(),
+            "load_seconds": {k: round(v, 2) for k, v in self.load_seconds.items()},
+            "memory_mb":    {k: round(v / 2**20, 1) for k, v in self.memory_bytes.items()},
+        }
+
+
+# Singleton registry instance
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_registry() -> ModelRegistry:
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+    return _registry
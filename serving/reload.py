@@ -0,0 +1,134 @@
+"""
+Zero-downtime LoRA adapter reloads.
+
+A reload loads the new adapter weights next to the ones being served, runs a
+smoke prompt through them and only then switches new requests over (see
+ModelRegistry.reload_adapter); requests already running finish on the old
+weights. Reloads run on a background thread, one at a time, and are started
+either through the admin API or by the file watcher, which polls the adapter
+files and reloads once a changed set of files has stopped changing for one
+poll interval (so a half-copied checkpoint is never picked up).
+"""
+import os
+import threading
+import time
+
+from serving import metrics
+from serving.models import ADAPTER_FILES, DEFAULT_ADAPTER
+
+ADAPTER_WATCH          = os.environ.get("AYURVEDA_ADAPTER_WATCH", "0") == "1"
+ADAPTER_WATCH_INTERVAL = float(os.environ.get("AYURVEDA_ADAPTER_WATCH_INTERVAL", "10"))
+
+
+class ReloadInProgress(RuntimeError):
+    """Another reload is still running."""
+
+
+def _fingerprint(path: str):
+    """(mtime, size) of each adapter file; None while any is missing."""
+    stats = []
+    for name in ADAPTER_FILES:
+        try:
+            st = os.stat(os.path.join(path, name))
+        except FileNotFoundError:
+            return None
+        stats.append((st.st_mtime_ns, st.st_size))
+    return tuple(stats)
+
+
+class AdapterReloader:
+    """Runs adapter reloads in the background and optionally watches for new files."""
+
+    def __init__(self, registry, validate, interval: float = ADAPTER_WATCH_INTERVAL):
+        self.registry = registry
+        self.validate = validate
+        self.interval = interval
+        self._lock    = threading.Lock()
+        self._stop    = threading.Event()
+        self._thread  = None
+        self._status  = {}   # adapter name → last reload attempt
+
+    def reload(self, name: str = DEFAULT_ADAPTER, path: str = None) -> dict:
+        """Reload synchronously; raises ReloadInProgress or the load/validation error."""
+        if not self._lock.acquire(blocking=False):
+            raise ReloadInProgress("An adapter reload is already running")
+        try:
+            return self._reload(name, path)
+        finally:
+            self._lock.release()
+
+    def start_reload(self, name: str = DEFAULT_ADAPTER, path: str = None) -> dict:
+        """Begin a reload on a background thread and return its initial status."""
+        # Unknown names, merged mode and quantized models fail here rather
+        # than in the thread
+        self.registry.get_adapter(name)
+        self.registry.check_adapter_loading()
+        if not self._lock.acquire(blocking=False):
+            raise ReloadInProgress("An adapter reload is already running")
+        self._status[name] = {"state": "loading", "path": path,
+                              "started_at": time.time()}
+
+        def run():
+            try:
+                self._reload(name, path)
+            except Exception:
+                pass   # recorded in the status
+            finally:
+                self._lock.release()
+
+        threading.Thread(target=run, name=f"adapter-reload-{name}", daemon=True).start()
+        return self.status(name)
+
+    def _reload(self, name: str, path: str) -> dict:
+        started = time.time()
+        self._status[name] = {"state": "loading", "path": path, "started_at": started}
+        try:
+            info = self.registry.reload_adapter(name, path, validate=self.validate)
+        except Exception as e:
+            metrics.ADAPTER_RELOADS.inc(adapter=name, outcome="failed")
+            self._status[name] = {"state": "failed", "path": path, "error": str(e),
+                                  "started_at": started, "finished_at": time.time()}
+            print(f"[AdapterReloader] Reload of {name!r} failed, keeping the "
+                  f"current version: {e}")
+            raise
+        metrics.ADAPTER_RELOADS.inc(adapter=name, outcome="swapped")
+        self._status[name] = {"state": "swapped", **info,
+                              "started_at": started, "finished_at": time.time()}
+        return info
+
+    def status(self, name: str = None) -> dict:
+        if name is not None:
+            return dict(self._status.get(name, {"state": "idle"}))
+        return {n: dict(s) for n, s in self._status.items()}
+
+    # ── File watch ──────────────────────────────────────────────────────────
+    def watch(self, name: str = DEFAULT_ADAPTER):
+        """Reload `name` whenever the files at its path change."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch_loop, args=(name,),
+                                        name=f"adapter-watch-{name}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch_loop(self, name: str):
+        path    = self.registry.get_adapter(name).path
+        served  = _fingerprint(path)
+        pending = None
+        while not self._stop.wait(self.interval):
+            current = _fingerprint(path)
+            if current is None or current == served:
+                pending = None
+                continue
+            if current != pending:
+                # Changed since the last poll; wait until the copy settles
+                pending = current
+                continue
+            try:
+                self.reload(name, path)
+            except ReloadInProgress:
+                continue   # an admin reload got there first; check again next poll
+            except Exception:
+                pass       # recorded in the status; retried only on the next change
+            served, pending = current, None
@@ -0,0 +1,207 @@
+"""
+Offline-first resolution of model files.
+
+Air-gapped nodes cannot reach the Hugging Face hub, and even on connected
+ones a hub round-trip per file adds timeouts to every cold start. The
+resolver turns each model the registry needs into a local directory before
+anything is loaded:
+
+  base model → AYURVEDA_MODEL_DIR if it holds a checkpoint, else the local
+               hub cache (never the network while AYURVEDA_OFFLINE=1)
+  adapter    → its directory, which also supplies the tokenizer and chat
+               template the fine-tune was trained with
+
+Every directory is checked for the files a load needs, so a missing or
+partial checkpoint fails at once with a message saying where it looked and
+how to fix it, rather than deep inside from_pretrained. If a manifest of
+SHA-256 hashes exists (AYURVEDA_MODEL_MANIFEST, written with
+`python -m serving.resolver --write-manifest`) the files are verified against
+it as well. Time spent per phase is kept in `seconds`.
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+
+MODEL_DIR     = os.environ.get("AYURVEDA_MODEL_DIR", "models/medgemma-4b-it")
+OFFLINE       = os.environ.get("AYURVEDA_OFFLINE", "1") == "1"
+MANIFEST_PATH = os.environ.get("AYURVEDA_MODEL_MANIFEST", "models/manifest.json")
+
+CONFIG_FILE     = "config.json"
+WEIGHTS_FILE    = "model.safetensors"
+WEIGHTS_INDEX   = "model.safetensors.index.json"
+TOKENIZER_FILES = ("tokenizer.json", "tokenizer_config.json")
+# Files that determine the adapter's outputs (also hashed for cache keys)
+ADAPTER_FILES   = ("adapter_config.json", "adapter_model.safetensors")
+
+
+class ModelResolutionError(OSError):
+    """A model's files are missing locally or fail verification."""
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def checkpoint_files(directory: str) -> list:
+    """config + weight files of a transformers checkpoint (sharded or not)."""
+    index = os.path.join(directory, WEIGHTS_INDEX)
+    if os.path.exists(index):
+        with open(index) as f:
+            shards = sorted(set(json.load(f)["weight_map"].values()))
+        return [CONFIG_FILE, WEIGHTS_INDEX, *shards]
+    return [CONFIG_FILE, WEIGHTS_FILE]
+
+
+def _missing(directory: str, names) -> list:
+    return [n for n in names if not os.path.exists(os.path.join(directory, n))]
+
+
+class ModelResolver:
+    """Maps model ids and paths to verified local directories."""
+
+    def __init__(self, model_dir: str = MODEL_DIR, offline: bool = OFFLINE,
+                 manifest_path: str = MANIFEST_PATH):
+        self.model_dir     = model_dir
+        self.offline       = offline
+        self.manifest_path = manifest_path
+        self.seconds       = {}
+        self._resolved     = {}
+        self._manifest     = None
+        if manifest_path and os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self._manifest = json.load(f)["files"]
+
+    def hub_kwargs(self) -> dict:
+        """from_pretrained kwargs: never touch the network when offline."""
+        return {"local_files_only": True} if self.offline else {"token": True}
+
+    def _timed(self, phase: str, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.seconds[phase] = self.seconds.get(phase, 0.0) + time.perf_counter() - start
+
+    # ── Checkpoints ─────────────────────────────────────────────────────────
+    def resolve(self, repo_id: str, role: str, local_dir: str = None) -> str:
+        """
+        Local directory holding `repo_id`. `local_dir` (default: the model
+        directory for role "base") is preferred over the hub cache. Online,
+        an uncached model resolves to `repo_id` itself and is downloaded by
+        from_pretrained.
+        """
+        if role not in self._resolved:
+            path = self._timed(f"resolve:{role}", self._locate, repo_id, role, local_dir)
+            if os.path.isdir(path):
+                missing = _missing(path, checkpoint_files(path))
+                if missing:
+                    raise ModelResolutionError(
+                        f"{role} model at {path} is incomplete, missing: "
+                        f"{', '.join(missing)}")
+                self._timed(f"verify:{role}", self.verify, role, path)
+            self._resolved[role] = path
+        return self._resolved[role]
+
+    def _locate(self, repo_id: str, role: str, local_dir: str = None) -> str:
+        local_dir = local_dir or (self.model_dir if role == "base" else None)
+        if local_dir and os.path.exists(os.path.join(local_dir, CONFIG_FILE)):
+            return local_dir
+        if os.path.exists(os.path.join(repo_id, CONFIG_FILE)):
+            return repo_id   # already a local path
+        from huggingface_hub import snapshot_download
+        try:
+            return snapshot_download(repo_id, local_files_only=True)
+        except Exception as e:
+            if not self.offline:
+                return repo_id
+            raise ModelResolutionError(
+                f"{role} model {repo_id!r} is not available offline: not in "
+                f"{local_dir or '(no local directory)'} nor in the Hugging Face cache "
+                f"({type(e).__name__}). On a connected machine run "
+                f"`huggingface-cli download {repo_id} --local-dir "
+                f"{local_dir or MODEL_DIR}` and copy the directory over, "
+                f"or set AYURVEDA_OFFLINE=0 to download on start.") from None
+
+    # ── Adapters ────────────────────────────────────────────────────────────
+    def adapter(self, path: str, role: str = None) -> str:
+        """
+        Check a LoRA adapter directory; with `role`, also verify it against
+        the manifest (startup adapters only; hot reloads bring new hashes).
+        """
+        missing = _missing(path, ADAPTER_FILES) if os.path.isdir(path) else ["directory"]
+        if missing:
+            raise ModelResolutionError(
+                f"LoRA adapter at {path} is incomplete, missing: {', '.join(missing)}")
+        if role is not None:
+            self._timed(f"verify:{role}", self.verify, role, path)
+        return path
+
+    def tokenizer_source(self, adapter_path: str, fallback: str) -> str:
+        """The adapter's own tokenizer and chat template when it ships them."""
+        if adapter_path and not _missing(adapter_path, TOKENIZER_FILES):
+            return adapter_path
+        return fallback
+
+    # ── Manifest ────────────────────────────────────────────────────────────
+    def verify(self, role: str, directory: str):
+        """Compare `directory` against the manifest entries "<role>/<file>"."""
+        if not self._manifest:
+            return
+        prefix = f"{role}/"
+        for key, expected in self._manifest.items():
+            if not key.startswith(prefix):
+                continue
+            path = os.path.join(directory, key[len(prefix):])
+            if not os.path.exists(path):
+                raise ModelResolutionError(f"{path} listed in {self.manifest_path} is missing")
+            if _sha256(path) != expected:
+                raise ModelResolutionError(
+                    f"{path} does not match {self.manifest_path} (sha256 differs); "
+                    f"the file is corrupt or was replaced")
+
+    def write_manifest(self, directories: dict) -> dict:
+        """Hash the load-relevant files of {role: directory} into the manifest."""
+        files = {}
+        for role, directory in directories.items():
+            names = (ADAPTER_FILES if role.startswith("adapter")
+                     else checkpoint_files(directory))
+            for name in names:
+                files[f"{role}/{name}"] = _sha256(os.path.join(directory, name))
+        if os.path.dirname(self.manifest_path):
+            os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+        with open(self.manifest_path, "w") as f:
+            json.dump({"files": files}, f, indent=2, sort_keys=True)
+        self._manifest = files
+        return files
+
+
+if __name__ == "__main__":
+    from serving.models import BASE_MODEL, LORA_PATH
+
+    parser = argparse.ArgumentParser(
+        description="Resolve (and optionally pin) the model files used for serving.")
+    parser.add_argument("--base-model", default=BASE_MODEL)
+    parser.add_argument("--adapter", default=LORA_PATH)
+    parser.add_argument("--write-manifest", action="store_true",
+                        help=f"hash the resolved files into {MANIFEST_PATH}")
+    args = parser.parse_args()
+
+    resolver = ModelResolver()
+    if args.write_manifest:
+        resolver._manifest = None   # resolve without verifying against the old one
+    base = resolver.resolve(args.base_model, "base")
+    resolver.adapter(args.adapter, "adapter")
+    print(f"base      → {base}")
+    print(f"adapter   → {args.adapter}")
+    print(f"tokenizer → {resolver.tokenizer_source(args.adapter, base)}")
+    if args.write_manifest:
+        files = resolver.write_manifest({"base": base, "adapter": args.adapter})
+        print(f"Wrote {len(files)} hashes to {resolver.manifest_path}")
+    for phase, seconds in resolver.seconds.items():
+        print(f"{phase:>16}: {seconds:.2f}s")
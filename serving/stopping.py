@@ -0,0 +1,112 @@
+"""
+StoppingCriteria hooks for model.generate.
+
+`generate` calls every criterion once per decoding step, right after the new
+token is appended, which makes them a convenient per-step hook: they are used
+here for timing as well as for actually stopping rows.
+"""
+import re
+import time
+import torch
+from transformers import StoppingCriteria
+
+
+def _no_stop(input_ids: torch.LongTensor) -> torch.BoolTensor:
+    return torch.zeros(input_ids.shape[0], dtype=torch.bool, device=input_ids.device)
+
+
+class FirstTokenTimer(StoppingCriteria):
+    """Never stops; records when the first new token came out of generate."""
+
+    def __init__(self):
+        self.start          = time.perf_counter()
+        self.first_token_at = None
+
+    def __call__(self, input_ids, scores, **kwargs) -> torch.BoolTensor:
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        return _no_stop(input_ids)
+
+    def timings(self, generated_tokens: int) -> dict:
+        """TTFT and post-first-token decode rate; call right after generate."""
+        end   = time.perf_counter()
+        first = self.first_token_at or end
+        decode_seconds = end - first
+        rate = ((generated_tokens - 1) / decode_seconds
+                if decode_seconds > 0 and generated_tokens > 1 else 0.0)
+        return {"ttft_seconds": first - self.start,
+                "decode_tokens_per_second": rate}
+
+
+class CancellationCriteria(StoppingCriteria):
+    """Stops each row as soon as its request's CancellationToken is set."""
+
+    def __init__(self, tokens):
+        self.tokens = list(tokens)
+
+    def __call__(self, input_ids, scores, **kwargs) -> torch.BoolTensor:
+        return torch.tensor([t is not None and t.cancelled for t in self.tokens],
+                            dtype=torch.bool, device=input_ids.device)
+
+
+class StructureStoppingCriteria(StoppingCriteria):
+    """
+    Stops rows whose structured answer is finished or has degenerated:
+
+      section_complete → the final section header was followed by some
+                         content and then a blank line
+      stop_marker      → the model began text we discard anyway (e.g. its own
+                         disclaimer, which SafetyAgent replaces)
+      repetition       → the last `repeat_span` tokens repeat with a period of
+                         at most `max_period` tokens
+
+    Only the trailing `window` tokens are decoded per step. `reasons[i]` is the
+    rule that stopped row i, or None.
+    """
+
+    def __init__(self, tokenizer, batch_size: int, prompt_length: int,
+                 final_section: str, stop_markers=(), window: int = 16, max_period: int = 32,
+                 repeat_span: int = 48):
+        self.tokenizer     = tokenizer
+        self.final_section = final_section
+        self.stop_markers  = tuple(stop_markers)
+        self.window        = window
+        self.max_period    = max_period
+        self.repeat_span   = repeat_span
+        self.reasons       = [None] * batch_size
+        self._section_at   = [None] * batch_size
+        self._start        = prompt_length
+
+    def __call__(self, input_ids, scores, **kwargs) -> torch.BoolTensor:
+        for i, row in enumerate(input_ids):
+            if self.reasons[i] is None:
+                self.reasons[i] = self._check(i, row[self._start:])
+        return torch.tensor([r is not None for r in self.reasons],
+                            dtype=torch.bool, device=input_ids.device)
+
+    def _check(self, i: int, generated: torch.LongTensor):
+        tail = self.tokenizer.decode(generated[-self.window:], skip_special_tokens=True)
+        if any(marker in tail for marker in self.stop_markers):
+            return "stop_marker"
+        if self._section_at[i] is None:
+            if self.final_section in tail:
+                self._section_at[i] = len(generated)
+        else:
+            body = self.tokenizer.decode(generated[self._section_at[i]:],
+                                         skip_special_tokens=True)
+            if re.search(r"\S[^\n]*\n[ \t]*\n", body):
+                return "section_complete"
+        if self._repeating(generated):
+            return "repetition"
+        return None
+
+    def _repeating(self, generated: torch.LongTensor) -> bool:
+        span = self.repeat_span
+        for period in range(1, self.max_period + 1):
+            if len(generated) < span + period:
+                break
+            if torch.equal(generated[-span:], generated[-span - period:-period]):
+                # Rows that already hit EOS repeat the pad token; ignore those
+                return bool(self.tokenizer.decode(
+                    generated[-period:], skip_special_tokens=True).strip())
+        return False
@@ -0,0 +1,144 @@
+"""
+Per-request tracing spans written to a local JSONL trace store.
+
+Metrics say that assessments are slow; a trace says where one request's time
+went. Every API request gets a trace id (taken from an incoming X-Trace-Id or
+W3C traceparent header, else generated) and every pipeline node and model
+phase records a span under it:
+
+  http POST /api/assess
+  └─ pipeline.assess
+     ├─ executor.queue
+     ├─ node.symptom / node.dosha
+     ├─ node.guidance
+     │  └─ guidance.tokenize → guidance.prefill → guidance.decode → guidance.detokenize
+     └─ node.safety
+
+The current span lives in a ContextVar, so it follows the request across
+awaits, `asyncio.to_thread` and the inference executor (which copies the
+context into its worker). Batched generation runs on a shared thread, so
+model phases are timed there and recorded afterwards by the requesting agent
+with `record_timeline`. A span opened with no trace active starts a new
+trace, so jobs and scripts are traced too.
+
+Spans are appended as JSON lines to AYURVEDA_TRACE_PATH, rotated at
+AYURVEDA_TRACE_MAX_MB. Summarise them with scripts/trace_summary.py.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+
+TRACING_ENABLED = os.environ.get("AYURVEDA_TRACING", "1") == "1"
+TRACE_PATH      = os.environ.get("AYURVEDA_TRACE_PATH", "cache/traces.jsonl")
+TRACE_MAX_BYTES = int(float(os.environ.get("AYURVEDA_TRACE_MAX_MB", "50")) * 2**20)
+TRACE_BACKUPS   = int(os.environ.get("AYURVEDA_TRACE_BACKUPS", "5"))
+
+TRACE_HEADER = "X-Trace-Id"
+_TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-[0-9a-f]{16}-[0-9a-f]{2}$")
+
+# (trace_id, span_id) of the innermost open span
+_current = ContextVar("ayurveda_trace_span", default=None)
+
+# perf_counter() → wall clock, for spans timed with perf_counter elsewhere
+_EPOCH_OFFSET = time.time() - time.perf_counter()
+
+_logger = None
+_logger_lock = threading.Lock()
+
+
+def _store() -> logging.Logger:
+    global _logger
+    with _logger_lock:
+        if _logger is None:
+            if os.path.dirname(TRACE_PATH):
+                os.makedirs(os.path.dirname(TRACE_PATH), exist_ok=True)
+            handler = RotatingFileHandler(TRACE_PATH, maxBytes=TRACE_MAX_BYTES,
+                                          backupCount=TRACE_BACKUPS)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger = logging.getLogger("ayurveda.trace")
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            _logger = logger
+    return _logger
+
+
+def _new_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def trace_id_from_headers(headers) -> str:
+    """Incoming trace id (X-Trace-Id, then traceparent), or a new one."""
+    trace_id = headers.get(TRACE_HEADER)
+    if trace_id and re.fullmatch(r"[0-9A-Za-z-]{1,64}", trace_id):
+        return trace_id
+    match = _TRACEPARENT.match(headers.get("traceparent", ""))
+    return match.group(1) if match else uuid.uuid4().hex
+
+
+def current_trace_id():
+    span = _current.get()
+    return span[0] if span else None
+
+
+def _write(trace_id: str, span_id: str, parent_id, name: str,
+           start: float, end: float, attrs: dict):
+    _store().info(json.dumps({
+        "trace_id":    trace_id,
+        "span_id":     span_id,
+        "parent_id":   parent_id,
+        "name":        name,
+        "start":       round(start, 6),   # epoch seconds
+        "duration_ms": round((end - start) * 1000, 3),
+        "thread":      threading.current_thread().name,
+        **({"attrs": attrs} if attrs else {}),
+    }, default=str))
+
+
+@contextmanager
+def span(name: str, trace_id: str = None, **attrs):
+    """
+    Time the enclosed block as a child of the current span. `trace_id`
+    starts a new trace with that id (as the API does per request).
+    """
+    if not TRACING_ENABLED:
+        yield None
+        return
+    parent  = _current.get()
+    if trace_id is None:
+        trace_id, parent_id = parent if parent else (uuid.uuid4().hex, None)
+    else:
+        parent_id = None
+    span_id = _new_id()
+    token   = _current.set((trace_id, span_id))
+    start   = time.time()
+    try:
+        yield span_id
+    except BaseException as e:
+        attrs["error"] = type(e).__name__
+        raise
+    finally:
+        _current.reset(token)
+        _write(trace_id, span_id, parent_id, name, start, time.time(), attrs)
+
+
+def record(name: str, start: float, end: float, **attrs):
+    """Record an already-finished span timed with perf_counter()."""
+    parent = _current.get()
+    if not TRACING_ENABLED or parent is None or start is None or end is None:
+        return
+    _write(parent[0], _new_id(), parent[1], name,
+           start + _EPOCH_OFFSET, end + _EPOCH_OFFSET, attrs)
+
+
+def record_timeline(prefix: str, timeline: dict, **attrs):
+    """Record {phase: (start, end)} perf_counter pairs as `prefix.phase` spans."""
+    for phase, (start, end) in (timeline or {}).items():
+        record(f"{prefix}.{phase}", start, end, **attrs)
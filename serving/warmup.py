@@ -0,0 +1,64 @@
+"""
+Model preload and warm-up at server start.
+
+Without it the first assessment pays for loading MedGemma (tens of seconds)
+and for first-call CUDA work, and concurrent first requests all pile up on
+the load. StartupTask runs the load and warm-up phases on a background
+thread as soon as the server starts, so the event loop stays free and
+/api/health answers at once, while /api/ready reports 503 until every phase
+has finished. Requests that arrive meanwhile block on the model load rather
+than failing.
+"""
+import os
+import threading
+import time
+
+PRELOAD = os.environ.get("AYURVEDA_PRELOAD", "1") == "1"
+
+PENDING, RUNNING, READY, FAILED = "pending", "running", "ready", "failed"
+
+
+class StartupTask:
+    """Runs named phases in order on a background thread and tracks readiness."""
+
+    def __init__(self, phases: list):
+        """`phases` is a list of (name, callable) pairs."""
+        self.phases  = phases
+        self.state   = PENDING
+        self.phase   = None
+        self.error   = None
+        self.seconds = {}
+        self._done   = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="model-startup",
+                                        daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        self.state = RUNNING
+        try:
+            for name, fn in self.phases:
+                self.phase = name
+                start = time.perf_counter()
+                fn()
+                self.seconds[name] = round(time.perf_counter() - start, 2)
+            self.state, self.phase = READY, None
+        except Exception as e:
+            self.state, self.error = FAILED, f"{type(e).__name__}: {e}"
+            print(f"[StartupTask] {self.phase} failed: {self.error}")
+        finally:
+            self._done.set()
+
+    @property
+    def ready(self) -> bool:
+        return self.state == READY
+
+    def wait(self, timeout: float = None) -> bool:
+        self._done.wait(timeout)
+        return self.ready
+
+    def status(self) -> dict:
+        return {"state": self.state, "phase": self.phase,
+                "seconds": dict(self.seconds), "error": self.error}
@@ -0,0 +1,84 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# The API mounts frontend/ by relative path
+os.chdir(ROOT)
+
+
+# Character-level vocabulary: every printable ASCII character plus newline
+SPECIAL_TOKENS = ["<eos>", "<unk>"]
+ADAPTERS = ("default", "other")
+
+
+@pytest.fixture(scope="session")
+def tiny_tokenizer():
+    """Tokenizer built in memory, so the tests never touch the hub."""
+    pytest.importorskip("transformers")
+    from tokenizers import Regex, Tokenizer, models, pre_tokenizers
+    from transformers import PreTrainedTokenizerFast
+
+    vocab = {token: i for i, token in enumerate(SPECIAL_TOKENS)}
+    for char in [chr(i) for i in range(32, 127)] + ["\n"]:
+        vocab[char] = len(vocab)
+    backend = Tokenizer(models.WordLevel(vocab, unk_token="<unk>"))
+    backend.pre_tokenizer = pre_tokenizers.Split(Regex(r"[\s\S]"), behavior="isolated")
+    # Padded with EOS on the left, as the registry configures MedGemma's
+    return PreTrainedTokenizerFast(tokenizer_object=backend, eos_token="<eos>",
+                                   pad_token="<eos>", unk_token="<unk>",
+                                   padding_side="left")
+
+
+def _tiny_llama(tokenizer, seed: int = 0):
+    import torch
+    from transformers import LlamaConfig, LlamaForCausalLM
+
+    torch.manual_seed(seed)
+    config = LlamaConfig(
+        vocab_size=len(tokenizer), hidden_size=64, intermediate_size=128,
+        num_hidden_layers=2, num_attention_heads=4, num_key_value_heads=2,
+        max_position_embeddings=2048, bos_token_id=None,
+        eos_token_id=tokenizer.eos_token_id, pad_token_id=tokenizer.pad_token_id)
+    return LlamaForCausalLM(config).eval()
+
+
+@pytest.fixture(scope="session")
+def tiny_model(tiny_tokenizer):
+    """Random two-layer Llama; fast enough to decode on CPU."""
+    pytest.importorskip("torch")
+    return _tiny_llama(tiny_tokenizer)
+
+
+@pytest.fixture(scope="session")
+def tiny_peft_model(tiny_tokenizer):
+    """Tiny Llama carrying two random LoRA adapters, named like the registry's."""
+    pytest.importorskip("peft")
+    import torch
+    from peft import LoraConfig, get_peft_model
+
+    def lora():
+        # Random B as well as A, so each adapter really changes the output
+        return LoraConfig(r=8, lora_alpha=32, target_modules=["q_proj", "v_proj"],
+                          init_lora_weights=False)
+
+    model = get_peft_model(_tiny_llama(tiny_tokenizer), lora(), adapter_name=ADAPTERS[0])
+    torch.manual_seed(1)
+    model.add_adapter(ADAPTERS[1], lora())
+    return model.eval()
+
+
+def reference_tokens(model, ids: list, max_new_tokens: int, eos: int, **kwargs) -> list:
+    """Plain unpadded, unbatched greedy `generate`, cut after the first EOS."""
+    import torch
+
+    with torch.inference_mode():
+        out = model.generate(
+            input_ids=torch.tensor([ids]),
+            attention_mask=torch.ones(1, len(ids), dtype=torch.long),
+            max_new_tokens=max_new_tokens, do_sample=False,
+            eos_token_id=eos, pad_token_id=eos, **kwargs)
+    tokens = out[0, len(ids):].tolist()
+    return tokens[:tokens.index(eos) + 1] if eos in tokens else tokens
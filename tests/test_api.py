@@ -0,0 +1,102 @@
+"""API behaviour that needs the full app, but no model (the pipeline is stubbed)."""
+import asyncio
+import json
+import time
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("torch")
+
+from api import main
+from serving.cancellation import GenerationCancelled
+from serving.tracing import TRACE_HEADER
+
+DISCONNECT_AFTER = 0.3
+
+
+def _post(path: str, body: dict, headers: dict = None):
+    """Run one POST through the ASGI app; the client drops after DISCONNECT_AFTER."""
+    payload  = json.dumps(body).encode()
+    extra    = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": path,
+        "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"content-type", b"application/json"),
+                    (b"content-length", str(len(payload)).encode()), *extra],
+        "client": ("testclient", 50000), "server": ("testserver", 80),
+    }
+    pending = [{"type": "http.request", "body": payload, "more_body": False}]
+    sent    = []
+    start   = time.monotonic()
+
+    async def receive():
+        if pending:
+            return pending.pop(0)
+        if time.monotonic() - start >= DISCONNECT_AFTER:
+            return {"type": "http.disconnect"}
+        # Like uvicorn: block until the client sends or goes away
+        await asyncio.sleep(DISCONNECT_AFTER)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(main.app(scope, receive, send))
+    return sent, time.monotonic() - start
+
+
+def test_client_disconnect_cancels_assessment(monkeypatch):
+    seen = {}
+
+    async def slow_assessment(cancel_token=None, **fields):
+        seen["token"] = cancel_token
+        for _ in range(100):   # 5s unless cancelled
+            if cancel_token.cancelled:
+                raise GenerationCancelled(cancel_token.reason)
+            await asyncio.sleep(0.05)
+        return "finished"
+
+    monkeypatch.setattr(main, "aget_ayurvedic_assessment", slow_assessment)
+    monkeypatch.setattr(main, "DISCONNECT_POLL_SECONDS", 0.05)
+    disconnects = main.metrics.CLIENT_DISCONNECTS.value(endpoint="/api/assess")
+
+    sent, elapsed = _post("/api/assess", {"disease": "Diabetes", "symptoms": "fatigue"})
+
+    start = next(m for m in sent if m["type"] == "http.response.start")
+    assert start["status"] == main.CLIENT_CLOSED_REQUEST
+    assert seen["token"].cancelled
+    assert elapsed < 2
+    assert main.metrics.CLIENT_DISCONNECTS.value(endpoint="/api/assess") == disconnects + 1
+    # The trace middleware still tags the response
+    assert TRACE_HEADER.lower().encode() in dict(start["headers"])
+
+
+@pytest.mark.parametrize("configured, given", [(None, None), (None, ""),
+                                               ("secret", None), ("secret", "wrong")])
+def test_admin_api_fails_closed(monkeypatch, configured, given):
+    monkeypatch.setattr(main, "ADMIN_TOKEN", configured)
+    loads = []
+    monkeypatch.setattr(main.get_registry(), "load_adapter",
+                        lambda *args: loads.append(args) or {})
+
+    sent, _ = _post("/api/admin/adapters", {"name": "x", "path": "/tmp"},
+                    headers=None if given is None else {"X-Admin-Token": given})
+
+    start = next(m for m in sent if m["type"] == "http.response.start")
+    assert start["status"] == 403
+    assert loads == []
+
+
+def test_jobs_reject_deadlines(monkeypatch):
+    submitted = []
+    monkeypatch.setattr(main.job_store, "submit",
+                        lambda fields: submitted.append(fields))
+
+    sent, _ = _post("/api/jobs", {"disease": "Diabetes", "symptoms": "fatigue",
+                                  "deadline_ms": 500})
+
+    start = next(m for m in sent if m["type"] == "http.response.start")
+    assert start["status"] == 400
+    assert submitted == []
@@ -0,0 +1,26 @@
+"""AssessmentCache tiers, used separately by the event loop and together by `get`."""
+from serving.cache import AssessmentCache
+
+
+def test_disk_tier_survives_restart_and_refills_memory(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    AssessmentCache(path).put("key", "assessment")
+
+    cache = AssessmentCache(path)
+    assert cache.get_memory("key") is None
+    assert cache.get_disk("key") == "assessment"
+    assert cache.get_memory("key") == "assessment"
+    assert cache.get("missing") is None
+    assert {k: cache.stats()[k] for k in ("memory_hits", "disk_hits", "misses")} == \
+        {"memory_hits": 1, "disk_hits": 1, "misses": 1}
+
+
+def test_memory_only_put_skips_disk(tmp_path):
+    cache = AssessmentCache(str(tmp_path / "cache.sqlite"), disk_entries=1)
+    cache.put_memory("a", "1")
+    assert cache.stats()["disk_entries"] == 0
+
+    cache.put_disk("a", "1")
+    cache.put_disk("b", "2")
+    assert cache.stats()["disk_entries"] == 1
+    assert cache.stats()["evictions"] == 1
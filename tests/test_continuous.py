@@ -0,0 +1,90 @@
+"""ContinuousBatchingEngine must decode exactly like unbatched greedy `generate`."""
+import time
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from conftest import ADAPTERS, reference_tokens
+from serving.continuous import ContinuousBatchingEngine
+from serving.deadline import DeadlineExceeded
+from serving.models import route_adapters
+from serving.prefix_cache import PrefixKVCache
+
+PREFIX = "You are an Ayurvedic clinical assistant."
+TIMEOUT = 120
+
+
+class SubmitAfter:
+    """Never stops its row; submits more requests once that row has `after` tokens."""
+
+    def __init__(self, engine, after: int, requests: list):
+        self.engine   = engine
+        self.after    = after
+        self.requests = requests
+        self.futures  = []
+        self.calls    = 0
+
+    def __call__(self, input_ids, scores):
+        self.calls += 1
+        if self.calls == self.after:
+            self.futures = [self.engine.submit(ids, n, adapter=adapter)
+                            for ids, n, adapter in self.requests]
+        return [False]
+
+
+def _ids(tokenizer, text: str) -> list:
+    return tokenizer(text, add_special_tokens=False)["input_ids"]
+
+
+def test_engine_matches_generate_with_joins_and_early_finishes(tiny_model, tiny_tokenizer):
+    eos    = tiny_tokenizer.eos_token_id
+    engine = ContinuousBatchingEngine(tiny_model, [eos], max_batch_size=2)
+    long_ids, short_ids = (_ids(tiny_tokenizer, "Vata: dry skin, insomnia and joint pain"),
+                           _ids(tiny_tokenizer, "Fever"))
+    joiners = [(_ids(tiny_tokenizer, "Kapha: congestion"), 12, None),
+               # Waits in the queue until a row leaves (max_batch_size=2)
+               (_ids(tiny_tokenizer, "Pitta: acidity and a burning sensation"), 3, None)]
+    join = SubmitAfter(engine, 4, joiners)
+
+    first = engine.submit(long_ids, 24, [join])
+    early = engine.submit(short_ids, 5)   # leaves while the others decode
+    results = [first.result(TIMEOUT), early.result(TIMEOUT)]
+    results += [f.result(TIMEOUT) for f in join.futures]
+
+    requests = [(long_ids, 24), (short_ids, 5)] + [(ids, n) for ids, n, _ in joiners]
+    assert len(results) == len(requests)
+    for (ids, n), tokens in zip(requests, results):
+        assert tokens == reference_tokens(tiny_model, ids, n, eos)
+
+
+def test_engine_mixed_adapters_with_prefix_cache(tiny_peft_model, tiny_tokenizer):
+    eos = tiny_tokenizer.eos_token_id
+    prefix_caches = {adapter: PrefixKVCache(tiny_peft_model, tiny_tokenizer, PREFIX,
+                                            adapter_names=[adapter])
+                     for adapter in ADAPTERS}
+    engine = ContinuousBatchingEngine(tiny_peft_model, [eos], max_batch_size=4,
+                                      prefix_cache_for=prefix_caches.get,
+                                      forward_context=lambda adapters: route_adapters(
+                                          tiny_peft_model, adapters))
+    same = _ids(tiny_tokenizer, PREFIX + " Disease: Diabetes")
+    requests = [(same, 10, ADAPTERS[0]), (same, 10, ADAPTERS[1]),
+                (_ids(tiny_tokenizer, PREFIX + " Disease: Migraine, stress"), 6, ADAPTERS[1])]
+    # Before the engine starts: PEFT installs per-call hooks for adapter_names,
+    # so two threads must not run the model at once
+    expected = [reference_tokens(tiny_peft_model, ids, n, eos, adapter_names=[adapter])
+                for ids, n, adapter in requests]
+    # Otherwise the test could not tell whether rows were routed at all
+    assert expected[0] != expected[1]
+
+    futures = [engine.submit(ids, n, adapter=adapter) for ids, n, adapter in requests]
+    assert [f.result(TIMEOUT) for f in futures] == expected
+
+
+def test_engine_drops_requests_past_their_deadline(tiny_model, tiny_tokenizer):
+    engine  = ContinuousBatchingEngine(tiny_model, [tiny_tokenizer.eos_token_id])
+    expired = engine.submit(_ids(tiny_tokenizer, "Fever"), 5,
+                            deadline=time.monotonic() - 1)
+    with pytest.raises(DeadlineExceeded):
+        expired.result(TIMEOUT)
@@ -0,0 +1,163 @@
+"""generate_batch must match unpadded, unbatched greedy `generate` row by row."""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+pytest.importorskip("peft")
+pytest.importorskip("pandas")   # agents/__init__ imports every agent
+
+from conftest import ADAPTERS, reference_tokens
+from agents import guidance_agent
+from serving.models import ModelRegistry, BASE_ADAPTER
+
+MAX_NEW_TOKENS = 10
+
+# Suffixes of different lengths, so rows are padded between prefix and details
+DETAILS = ["\n\nDisease: Diabetes\nSymptoms: fatigue, increased thirst",
+           "\n\nDisease: Cold",
+           "\n\nDisease: Hypertension\nSymptoms: headaches\nStress Levels: High"]
+
+
+@pytest.fixture
+def guidance(monkeypatch, tiny_peft_model, tiny_tokenizer):
+    """guidance_agent wired to a registry that serves the tiny PEFT model."""
+    registry = ModelRegistry(device="cpu", cpu_dtype="float32",
+                             extra_adapters=f"{ADAPTERS[1]}=unused")
+    registry._model     = tiny_peft_model
+    registry._processor = SimpleNamespace(tokenizer=tiny_tokenizer)
+    monkeypatch.setattr(guidance_agent, "get_registry", lambda: registry)
+    monkeypatch.setattr(guidance_agent, "_prefix_caches", {})
+    # Random weights ramble; keep stop rules from cutting rows short
+    monkeypatch.setattr(guidance_agent, "EARLY_STOP_ENABLED", False)
+    return guidance_agent
+
+
+def _expected(model, tokenizer, prompt: str, adapter: str) -> str:
+    ids = tokenizer(prompt, add_special_tokens=False)["input_ids"]
+    tokens = reference_tokens(model, ids, MAX_NEW_TOKENS, tokenizer.eos_token_id,
+                              adapter_names=[adapter])
+    return tokenizer.decode(tokens, skip_special_tokens=True)
+
+
+@pytest.mark.parametrize("prefix_cache", [True, False])
+def test_generate_batch_matches_unpadded_generate(guidance, monkeypatch, prefix_cache,
+                                                  tiny_peft_model, tiny_tokenizer):
+    monkeypatch.setattr(guidance, "PREFIX_CACHE_ENABLED", prefix_cache)
+    prompts = [guidance.PROMPT_PREFIX + details for details in DETAILS]
+
+    results = guidance.generate_batch(prompts, MAX_NEW_TOKENS)
+
+    assert [r["text"] for r in results] == [
+        _expected(tiny_peft_model, tiny_tokenizer, p, ADAPTERS[0]) for p in prompts]
+    # Disabled means never built, not built and ignored
+    assert bool(guidance._prefix_caches) == prefix_cache
+
+
+def test_generate_batch_mixed_adapters(guidance, tiny_peft_model, tiny_tokenizer):
+    prompts  = [guidance.PROMPT_PREFIX + d for d in (DETAILS[0], DETAILS[0], DETAILS[1])]
+    adapters = [ADAPTERS[0], ADAPTERS[1], ADAPTERS[0]]
+
+    results = guidance.generate_batch(prompts, MAX_NEW_TOKENS, adapters=adapters)
+
+    expected = [_expected(tiny_peft_model, tiny_tokenizer, p, a)
+                for p, a in zip(prompts, adapters)]
+    assert expected[0] != expected[1], "adapters must disagree for the test to mean anything"
+    assert [r["text"] for r in results] == expected
+    assert {r["cached_prefix_tokens"] for r in results} == {
+        guidance._get_prefix_cache(ADAPTERS[0]).num_tokens}
+
+
+def test_single_adapter_batches_skip_per_row_routing(guidance, tiny_peft_model,
+                                                    tiny_tokenizer):
+    with guidance.get_registry().generating([ADAPTERS[1]] * 2) as adapter_kwargs:
+        assert adapter_kwargs == {}
+        assert tiny_peft_model.active_adapter == ADAPTERS[1]
+    prompts = [guidance.PROMPT_PREFIX + d for d in DETAILS]
+
+    results = guidance.generate_batch(prompts, MAX_NEW_TOKENS,
+                                      adapters=[ADAPTERS[1]] * len(prompts))
+
+    assert [r["text"] for r in results] == [
+        _expected(tiny_peft_model, tiny_tokenizer, p, ADAPTERS[1]) for p in prompts]
+
+
+def test_concurrent_base_and_adapter_generations(guidance, tiny_peft_model, tiny_tokenizer):
+    """Text rows keep their adapter while other threads run the base weights."""
+    registry = guidance.get_registry()
+    eos      = tiny_tokenizer.eos_token_id
+    prompt   = guidance.PROMPT_PREFIX + DETAILS[0]
+    ids      = tiny_tokenizer(prompt, add_special_tokens=False)["input_ids"]
+    expected = _expected(tiny_peft_model, tiny_tokenizer, prompt, ADAPTERS[0])
+    base     = reference_tokens(tiny_peft_model, ids, MAX_NEW_TOKENS, eos,
+                                adapter_names=[BASE_ADAPTER])
+
+    def like_vision():
+        with registry.generating([BASE_ADAPTER]) as adapter_kwargs:
+            return reference_tokens(tiny_peft_model, ids, MAX_NEW_TOKENS, eos,
+                                    **adapter_kwargs)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        text   = [pool.submit(guidance.generate_batch, [prompt], MAX_NEW_TOKENS)
+                  for _ in range(8)]
+        vision = [pool.submit(like_vision) for _ in range(8)]
+        assert [f.result()[0]["text"] for f in text] == [expected] * len(text)
+        assert [f.result() for f in vision] == [base] * len(vision)
+
+
+def test_smoke_test_is_queued_with_live_traffic(guidance, monkeypatch):
+    threads = []
+    generate_batch = guidance.generate_batch
+
+    def recording(*args, **kwargs):
+        threads.append(threading.current_thread().name)
+        return generate_batch(*args, **kwargs)
+
+    monkeypatch.setattr(guidance, "generate_batch", recording)
+    monkeypatch.setattr(guidance, "BATCHING", "static")
+    monkeypatch.setattr(guidance, "_batcher", None)
+
+    guidance.smoke_test(guidance.get_registry().get_adapter(ADAPTERS[1]))
+
+    assert threads == ["GuidanceAgent-batcher"]
+
+
+@pytest.mark.parametrize("batching", ["static", "continuous"])
+def test_streamed_text_is_generated_with_live_traffic(guidance, monkeypatch, batching):
+    monkeypatch.setattr(guidance, "BATCHING", batching)
+    monkeypatch.setattr(guidance, "_batcher", None)
+    monkeypatch.setattr(guidance, "_engine", None)
+    prompts   = [guidance.PROMPT_PREFIX + details for details in DETAILS]
+    fragments = {i: [] for i in range(len(prompts))}
+
+    # One streamed and two plain requests, queued together
+    with ThreadPoolExecutor(len(prompts)) as pool:
+        results = list(pool.map(
+            lambda i: guidance.generate_queued(
+                prompts[i], MAX_NEW_TOKENS,
+                on_text=fragments[i].append if i == 0 else None),
+            range(len(prompts))))
+
+    assert "".join(fragments[0]) == results[0]["text"]
+    assert not fragments[1] and not fragments[2]
+
+
+def test_warmup_is_queued_with_live_traffic(guidance, monkeypatch):
+    threads = []
+    generate_batch = guidance.generate_batch
+
+    def recording(*args, **kwargs):
+        threads.append(threading.current_thread().name)
+        return generate_batch(*args, **kwargs)
+
+    monkeypatch.setattr(guidance, "generate_batch", recording)
+    monkeypatch.setattr(guidance, "BATCHING", "static")
+    monkeypatch.setattr(guidance, "_batcher", None)
+    monkeypatch.setattr(guidance, "WARMUP_MAX_NEW_TOKENS", 2)
+
+    guidance.warmup([16])
+
+    assert threads == ["GuidanceAgent-batcher"]
@@ -0,0 +1,32 @@
+"""ModelRegistry behaviour that needs no model weights."""
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+pytest.importorskip("peft")
+
+from serving.models import ModelRegistry, MERGED_MODE
+from serving.resolver import ModelResolver, ModelResolutionError
+
+
+def test_merged_registry_without_checkpoint_fails_on_load(tmp_path):
+    registry = ModelRegistry(mode=MERGED_MODE, merged_path=str(tmp_path / "missing"),
+                             device="cpu", cpu_dtype="float32",
+                             resolver=ModelResolver(model_dir=str(tmp_path), offline=True,
+                                                    manifest_path=None))
+
+    # /api/health still reports the registry
+    assert registry.report()["adapters"]["default"]["hash"] is None
+    with pytest.raises(ModelResolutionError):
+        registry.text_model()
+
+
+def test_quantized_registry_refuses_runtime_adapters(tmp_path):
+    registry = ModelRegistry(device="cpu", quantization="dynamic_int8")
+
+    # Refused before anything is loaded, with the way out in the message
+    with pytest.raises(ValueError, match="AYURVEDA_ADAPTERS"):
+        registry.load_adapter("other", str(tmp_path))
+    with pytest.raises(ValueError, match="quantized"):
+        registry.reload_adapter()
+    assert not registry.loaded